@@ -1,30 +1,123 @@
-import requests
+from http_utils import http_get, http_post
 import re
 import json
 from datetime import datetime, timedelta
-from bs4 import BeautifulSoup
+from functools import lru_cache
+from urllib.parse import quote
+
+try:
+    # C-backed parser for the profile scrapes; BeautifulSoup (imported on first
+    # use, to keep startup fast) is the fallback
+    from lxml import html as lxml_html
+except ImportError:
+    lxml_html = None
 
 DEFAULT_HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
     'Accept': 'application/json, text/plain, */*',
 }
 
-def fetch_codeforces_data(handle):
+# Handles per user.info call; keeps the query string well under URL limits
+CODEFORCES_BATCH_SIZE = 300
+
+def fetch_codeforces_info_batch(handles):
+    """
+    Resolves many Codeforces handles with a few multi-handle user.info calls.
+    Returns a dict mapping lowercased handle to its user.info entry.
+    Unknown handles are dropped from the request and left out of the result.
+    Raises ValueError if a failed call cannot be narrowed down to one handle.
+    """
+    infos = {}
+    pending = list(dict.fromkeys(handles))
+    while pending:
+        chunk, pending = pending[:CODEFORCES_BATCH_SIZE], pending[CODEFORCES_BATCH_SIZE:]
+        while chunk:
+            info_url = f"https://codeforces.com/api/user.info?handles={';'.join(quote(h, safe='') for h in chunk)}"
+            info_resp = http_get(info_url, headers=DEFAULT_HEADERS, timeout=10).json()
+            if info_resp.get("status") == "OK":
+                for user_info in info_resp["result"]:
+                    infos[user_info["handle"].lower()] = user_info
+                break
+            # The whole call fails if any handle is unknown; drop it and retry
+            missing = re.search(r"User with handle (\S+) not found", info_resp.get("comment", ""))
+            if not missing:
+                raise ValueError(f"Codeforces user.info failed: {info_resp.get('comment')}")
+            bad = missing.group(1).lower()
+            print(f"Codeforces handle not found: {bad}")
+            remaining = [h for h in chunk if h.lower() != bad]
+            if len(remaining) == len(chunk):
+                # The reported handle is not one we sent; retrying would loop
+                raise ValueError(f"Codeforces reported unknown handle {bad} not in the request")
+            chunk = remaining
+    return infos
+
+# user.status page sizes: the first sync walks the whole history in big pages,
+# later syncs only need the few submissions made since the last refresh
+CODEFORCES_FULL_PAGE = 1000
+CODEFORCES_DELTA_PAGE = 50
+
+def sync_codeforces_solved(handle, sync=None):
+    """
+    Brings a user's set of solved Codeforces problems up to date.
+    `sync` is the state from a previous call ({"last_submission_id", "solved"});
+    only submissions newer than last_submission_id are downloaded.
+    Returns the new state, or None if Codeforces returned an error.
+    """
+    last_id = sync["last_submission_id"] if sync else 0
+    solved = set(sync["solved"]) if sync else set()
+    page = CODEFORCES_DELTA_PAGE if last_id else CODEFORCES_FULL_PAGE
+    newest = last_id
+    # Submissions still being judged must be looked at again next time
+    pending_floor = None
+    start = 1
+    while True:
+        status_url = f"https://codeforces.com/api/user.status?handle={quote(handle, safe='')}&from={start}&count={page}"
+        status_resp = http_get(status_url, headers=DEFAULT_HEADERS, timeout=10).json()
+        if status_resp.get("status") != "OK":
+            return None
+
+        subs = status_resp["result"]
+        caught_up = False
+        for sub in subs:
+            if sub["id"] <= last_id:
+                caught_up = True
+                break
+            newest = max(newest, sub["id"])
+            verdict = sub.get("verdict")
+            if verdict == "OK":
+                prob = sub['problem']
+                solved.add(f"{prob.get('contestId', '')}{prob.get('index', '')}")
+            elif verdict in (None, "TESTING"):
+                pending_floor = sub["id"] if pending_floor is None else min(pending_floor, sub["id"])
+        if caught_up or len(subs) < page:
+            break
+        start += page
+
+    if pending_floor is not None:
+        newest = min(newest, pending_floor - 1)
+    return {"handle": handle.lower(), "last_submission_id": newest, "solved": solved}
+
+def fetch_codeforces_data(handle, user_info=None, sync=None):
     """
     Fetches detailed Codeforces data including last contest performance.
+    Pass `user_info` (from fetch_codeforces_info_batch) to skip the user.info call,
+    and `sync` (the stored solved-problem state) to only page through new submissions.
+    The updated state is returned under "codeforces_sync" for the caller to persist.
     """
     try:
         # User info
-        info_url = f"https://codeforces.com/api/user.info?handles={handle}"
-        info_resp = requests.get(info_url, headers=DEFAULT_HEADERS, timeout=10).json()
+        if user_info is None:
+            info_url = f"https://codeforces.com/api/user.info?handles={quote(handle, safe='')}"
+            info_resp = http_get(info_url, headers=DEFAULT_HEADERS, timeout=10).json()
+        else:
+            info_resp = {"status": "OK", "result": [user_info]}
         
         # Rating history
-        rating_url = f"https://codeforces.com/api/user.rating?handle={handle}"
-        rating_resp = requests.get(rating_url, headers=DEFAULT_HEADERS, timeout=10).json()
+        rating_url = f"https://codeforces.com/api/user.rating?handle={quote(handle, safe='')}"
+        rating_resp = http_get(rating_url, headers=DEFAULT_HEADERS, timeout=10).json()
 
-        # Status - fetch more to get a better count of unique solved problems
-        status_url = f"https://codeforces.com/api/user.status?handle={handle}&from=1&count=1000"
-        status_resp = requests.get(status_url, headers=DEFAULT_HEADERS, timeout=10).json()
+        # Solved problems, merged into the stored set
+        new_sync = sync_codeforces_solved(handle, sync)
 
         if info_resp["status"] == "OK":
             user_info = info_resp["result"][0]
@@ -34,135 +127,232 @@ def fetch_codeforces_data(handle):
             # Last contest rank
             last_contest_rank = rating_history[-1].get("rank", 0) if rating_history else 0
             
-            # Total unique problems solved (from the last 1000 submissions)
-            total_solved = 0
-            if status_resp.get("status") == "OK":
-                solved_problems = set()
-                for sub in status_resp["result"]:
-                    if sub.get("verdict") == "OK":
-                        prob = sub['problem']
-                        p_id = f"{prob.get('contestId', '')}{prob.get('index', '')}"
-                        solved_problems.add(p_id)
-                total_solved = len(solved_problems)
-
-            return {
+            data = {
                 "rating": user_info.get("rating", 0),
                 "rank": user_info.get("rank", "Unrated"),
                 "global_rank": last_contest_rank,
                 "country_rank": 0,
-                "recent_problems": total_solved, # Switched to Total Solved for consistency
                 "total_contests": total_contests
             }
+            # Total unique problems solved across the full submission history.
+            # If user.status failed and nothing is stored yet, the field is left
+            # out so the stored count is kept rather than reset to 0.
+            if new_sync is not None:
+                data["recent_problems"] = len(new_sync["solved"])
+                data["codeforces_sync"] = new_sync
+            elif sync:
+                data["recent_problems"] = len(sync["solved"])
+            return data
     except Exception as e:
         print(f"Error fetching Codeforces data for {handle}: {e}")
     return None
 
-def fetch_leetcode_data(handle):
-    """
-    Fetches LeetCode data via GraphQL with enhanced headers to avoid 402/403.
-    """
-    url = "https://leetcode.com/graphql"
-    headers = {
+LEETCODE_URL = "https://leetcode.com/graphql"
+
+# Usernames per aliased batch query; LeetCode rejects very large queries
+LEETCODE_BATCH_SIZE = 10
+
+# Contest ranking and solved counts for one user, in a single round trip
+LEETCODE_USER_FIELDS = """
+  {ranking}: userContestRanking(username: ${var}) {{
+    attendedContestsCount
+    rating
+    globalRanking
+  }}
+  {matched}: matchedUser(username: ${var}) {{
+    submitStats {{
+      acSubmissionNum {{
+        difficulty
+        count
+      }}
+    }}
+  }}
+"""
+
+def _leetcode_headers(referer_handle=None):
+    return {
         'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
         'Accept': 'application/json, text/plain, */*',
-        'Referer': f'https://leetcode.com/{handle}/',
+        'Referer': f'https://leetcode.com/{referer_handle}/' if referer_handle else 'https://leetcode.com/',
         'Origin': 'https://leetcode.com',
         'Connection': 'keep-alive',
         'Content-Type': 'application/json'
     }
-    
-    query = {
-        "query": """
-        query userContestRankingInfo($username: String!) {
-          userContestRanking(username: $username) {
-            attendedContestsCount
-            rating
-            globalRanking
-          }
-          recentSubmissionList(username: $username, limit: 20) {
-            timestamp
-            statusDisplay
-          }
+
+def _parse_leetcode_user(ranking, matched_user):
+    """Builds the user data dict from the userContestRanking/matchedUser results."""
+    if not ranking and not matched_user:
+        return None
+
+    total_solved = 0
+    stats = ((matched_user or {}).get("submitStats") or {}).get("acSubmissionNum") or []
+    for s in stats:
+        if s.get("difficulty") == "All":
+            total_solved = s.get("count", 0)
+
+    if ranking:
+        return {
+            "rating": int(ranking.get("rating") or 0),
+            "rank": "LeetCoder",
+            "global_rank": ranking.get("globalRanking") or 0,
+            "country_rank": 0,
+            "recent_problems": total_solved,
+            "total_contests": ranking.get("attendedContestsCount") or 0
         }
-        """,
+    # Users with no contest history
+    return {
+        "rating": 0, "rank": "LeetCoder", "global_rank": 0,
+        "country_rank": 0, "recent_problems": total_solved, "total_contests": 0
+    }
+
+def fetch_leetcode_data(handle):
+    """
+    Fetches LeetCode data via GraphQL with enhanced headers to avoid 402/403.
+    Contest ranking and solved counts come from one combined query.
+    """
+    query = {
+        "query": "query userProfile($username: String!) {"
+                 + LEETCODE_USER_FIELDS.format(ranking="userContestRanking", matched="matchedUser", var="username")
+                 + "}",
         "variables": {"username": handle}
     }
     try:
-        response = requests.post(url, json=query, headers=headers, timeout=10)
+        response = http_post(LEETCODE_URL, json=query, headers=_leetcode_headers(handle), timeout=10)
         if response.status_code != 200:
             return None
-            
-        data = response.json()
-        if "data" in data and data["data"].get("userContestRanking"):
-            ranking = data["data"]["userContestRanking"]
-            
-            # Fetch Total Solved from matchedUser
-            total_solved = 0
-            mu_query = {
-                "query": """
-                query userProblemsSolved($username: String!) {
-                  matchedUser(username: $username) {
-                    submitStats {
-                      acSubmissionNum {
-                        difficulty
-                        count
-                      }
-                    }
-                  }
-                }
-                """,
-                "variables": {"username": handle}
-            }
-            mu_resp = requests.post(url, json=mu_query, headers=headers, timeout=10)
-            if mu_resp.status_code == 200:
-                mu_data = mu_resp.json()
-                stats = mu_data.get("data", {}).get("matchedUser", {}).get("submitStats", {}).get("acSubmissionNum", [])
-                for s in stats:
-                    if s.get("difficulty") == "All":
-                        total_solved = s.get("count", 0)
 
-            return {
-                "rating": int(ranking.get("rating", 0)),
-                "rank": "LeetCoder",
-                "global_rank": ranking.get("globalRanking", 0),
-                "country_rank": 0,
-                "recent_problems": total_solved,
-                "total_contests": ranking.get("attendedContestsCount", 0)
-            }
-        else:
-            # Fallback for users with no contest history
-            mu_query = {
-                "query": """
-                query userProblemsSolved($username: String!) {
-                  matchedUser(username: $username) {
-                    submitStats {
-                      acSubmissionNum {
-                        difficulty
-                        count
-                      }
-                    }
-                  }
-                }
-                """,
-                "variables": {"username": handle}
-            }
-            mu_resp = requests.post(url, json=mu_query, headers=headers, timeout=10)
-            if mu_resp.status_code == 200:
-                mu_data = mu_resp.json()
-                stats = mu_data.get("data", {}).get("matchedUser", {}).get("submitStats", {}).get("acSubmissionNum", [])
-                total_solved = 0
-                for s in stats:
-                    if s.get("difficulty") == "All":
-                        total_solved = s.get("count", 0)
-                
-                return {
-                    "rating": 0, "rank": "LeetCoder", "global_rank": 0,
-                    "country_rank": 0, "recent_problems": total_solved, "total_contests": 0
-                }
+        data = response.json().get("data") or {}
+        return _parse_leetcode_user(data.get("userContestRanking"), data.get("matchedUser"))
     except Exception as e:
         print(f"Error fetching LeetCode data for {handle}: {e}")
     return None
 
+def fetch_leetcode_batch(handles):
+    """
+    Fetches many LeetCode users with aliased GraphQL queries, LEETCODE_BATCH_SIZE
+    usernames per POST. Returns a dict mapping each handle to its data (or None).
+    """
+    results = {}
+    handles = list(dict.fromkeys(handles))
+    for start in range(0, len(handles), LEETCODE_BATCH_SIZE):
+        chunk = handles[start:start + LEETCODE_BATCH_SIZE]
+        params = ", ".join(f"$u{i}: String!" for i in range(len(chunk)))
+        fields = "".join(
+            LEETCODE_USER_FIELDS.format(ranking=f"r{i}", matched=f"m{i}", var=f"u{i}")
+            for i in range(len(chunk))
+        )
+        query = {
+            "query": f"query userProfiles({params}) {{{fields}}}",
+            "variables": {f"u{i}": handle for i, handle in enumerate(chunk)}
+        }
+        try:
+            response = http_post(LEETCODE_URL, json=query, headers=_leetcode_headers(), timeout=15)
+            if response.status_code != 200:
+                raise ValueError(f"HTTP {response.status_code}")
+            # Unknown users show up as null fields plus an "errors" entry
+            data = response.json().get("data") or {}
+            for i, handle in enumerate(chunk):
+                results[handle] = _parse_leetcode_user(data.get(f"r{i}"), data.get(f"m{i}"))
+        except Exception as e:
+            print(f"Error fetching LeetCode batch {chunk}: {e}")
+            for handle in chunk:
+                results[handle] = None
+    return results
+
+# Only the profile sections we read are parsed into a tree; everything else
+# in the page (nav, scripts, submission tables) is skipped by the parser.
+# A regex rather than a list: while parsing, the strainer sees the raw class
+# string, so a list would miss e.g. class="rating-data-section problems-solved".
+CODECHEF_PROFILE_CLASSES = re.compile(r"(?:^|\s)(?:rating-number|rating|rating-ranks|problems-solved)(?:\s|$)")
+CODECHEF_CONTESTS_RE = re.compile(r'(\d+)\s+Contests')
+SOLVED_COUNT_RE = re.compile(r'\((\d+)\)')
+
+def _xpath_class(cls):
+    """XPath predicate matching elements that have `cls` among their classes (like bs4's class_=)."""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {cls} ")'
+
+def _lxml_document(html):
+    """Parses `html` with lxml, or returns None if lxml is unavailable or rejects it."""
+    if lxml_html is None:
+        return None
+    try:
+        return lxml_html.document_fromstring(html)
+    except (ValueError, lxml_html.etree.ParserError):
+        return None
+
+def _first(nodes):
+    return nodes[0] if nodes else None
+
+def parse_codechef_profile(html):
+    """
+    Extracts (rating, stars, global_rank, country_rank, problems_solved) from a
+    CodeChef profile page. Raises ValueError if the rating is not a number.
+    """
+    doc = _lxml_document(html)
+    if doc is None:
+        return _parse_codechef_soup(html)
+
+    rating_div = _first(doc.xpath(f'//div[{_xpath_class("rating-number")}]'))
+    rating = int(rating_div.text_content()) if rating_div is not None else 0
+
+    stars_span = _first(doc.xpath(f'//span[{_xpath_class("rating")}]'))
+    stars = str(stars_span.text_content()) if stars_span is not None else "Unrated"
+
+    global_rank = 0
+    country_rank = 0
+    rank_list = _first(doc.xpath(f'//div[{_xpath_class("rating-ranks")}]'))
+    if rank_list is not None:
+        ranks = [r.text_content() for r in rank_list.xpath('.//strong')]
+        if len(ranks) >= 2:
+            global_rank = int(ranks[0]) if ranks[0].isdigit() else 0
+            country_rank = int(ranks[1]) if ranks[1].isdigit() else 0
+
+    recent_problems = 0
+    h3 = _first(doc.xpath(f'(//section[{_xpath_class("problems-solved")}])[1]//h3[1]'))
+    if h3 is not None:
+        count_match = SOLVED_COUNT_RE.search(h3.text_content())
+        if count_match:
+            recent_problems = int(count_match.group(1))
+
+    return rating, stars, global_rank, country_rank, recent_problems
+
+@lru_cache(maxsize=None)
+def _codechef_strainer():
+    from bs4 import SoupStrainer
+    return SoupStrainer(class_=CODECHEF_PROFILE_CLASSES)
+
+def _parse_codechef_soup(html):
+    """parse_codechef_profile without lxml: strainer-limited html.parser."""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser', parse_only=_codechef_strainer())
+    rating_div = soup.find('div', class_='rating-number')
+    rating = int(rating_div.text) if rating_div else 0
+
+    stars_span = soup.find('span', class_='rating')
+    stars = stars_span.text if stars_span else "Unrated"
+
+    global_rank = 0
+    country_rank = 0
+    rank_list = soup.find('div', class_='rating-ranks')
+    if rank_list:
+        ranks = rank_list.find_all('strong')
+        if len(ranks) >= 2:
+            global_rank = int(ranks[0].text) if ranks[0].text.isdigit() else 0
+            country_rank = int(ranks[1].text) if ranks[1].text.isdigit() else 0
+
+    # Problems solved section
+    recent_problems = 0
+    solved_section = soup.find('section', class_='problems-solved')
+    if solved_section:
+        try:
+            h3_text = solved_section.find('h3').text
+            count_match = SOLVED_COUNT_RE.search(h3_text)
+            if count_match:
+                recent_problems = int(count_match.group(1))
+        except: pass
+
+    return rating, stars, global_rank, country_rank, recent_problems
+
 def fetch_codechef_data(handle):
     """
     Fetches CodeChef data using a more reliable unofficial API wrapper.
@@ -171,7 +361,7 @@ def fetch_codechef_data(handle):
     # Try the unofficial API first
     api_url = f"https://codechef-api.vercel.app/{handle}"
     try:
-        response = requests.get(api_url, headers=DEFAULT_HEADERS, timeout=10)
+        response = http_get(api_url, headers=DEFAULT_HEADERS, timeout=10)
         if response.status_code == 200:
             data = response.json()
             if data.get("status") == "success":
@@ -188,7 +378,7 @@ def fetch_codechef_data(handle):
     # Fallback to enhanced scraping
     url = f"https://www.codechef.com/users/{handle}"
     try:
-        response = requests.get(url, headers=DEFAULT_HEADERS, timeout=15)
+        response = http_get(url, headers=DEFAULT_HEADERS, timeout=15)
         if response.status_code != 200:
             return None
             
@@ -198,40 +388,13 @@ def fetch_codechef_data(handle):
                 "country_rank": 0, "recent_problems": 0, "total_contests": 0
             }
 
-        soup = BeautifulSoup(response.text, 'html.parser')
-        rating_div = soup.find('div', class_='rating-number')
-        rating = int(rating_div.text) if rating_div else 0
-        
-        stars_span = soup.find('span', class_='rating')
-        stars = stars_span.text if stars_span else "Unrated"
-        
-        global_rank = 0
-        country_rank = 0
-        rank_list = soup.find('div', class_='rating-ranks')
-        if rank_list:
-            ranks = rank_list.find_all('strong')
-            if len(ranks) >= 2:
-                global_rank = int(ranks[0].text) if ranks[0].text.isdigit() else 0
-                country_rank = int(ranks[1].text) if ranks[1].text.isdigit() else 0
-                
-        # Try to find contest count and problems solved
-        total_contests = 0
-        recent_problems = 0
-        
+        rating, stars, global_rank, country_rank, recent_problems = parse_codechef_profile(response.text)
+
         # Contest count often in Rating history or a script tag
-        contest_matches = re.findall(r'(\d+)\s+Contests', response.text)
-        if contest_matches:
-            total_contests = int(contest_matches[0])
-            
-        # Problems solved section
-        solved_section = soup.find('section', class_='problems-solved')
-        if solved_section:
-            try:
-                h3_text = solved_section.find('h3').text
-                count_match = re.search(r'\((\d+)\)', h3_text)
-                if count_match:
-                    recent_problems = int(count_match.group(1))
-            except: pass
+        total_contests = 0
+        contest_match = CODECHEF_CONTESTS_RE.search(response.text)
+        if contest_match:
+            total_contests = int(contest_match.group(1))
 
         return {
             "rating": rating,
@@ -253,7 +416,7 @@ def fetch_hackerrank_data(handle):
     headers = DEFAULT_HEADERS.copy()
     headers.update({'Accept': 'application/json'})
     try:
-        response = requests.get(url, headers=headers, timeout=10)
+        response = http_get(url, headers=headers, timeout=10)
         if response.status_code == 200:
             data = response.json().get('model', {})
             # HackerRank doesn't expose a single "contest count" easily via this API,
@@ -266,6 +429,9 @@ def fetch_hackerrank_data(handle):
                 "recent_problems": data.get('solved_challenges_count', 0),
                 "total_contests": 0
             }
+        elif response.status_code == 429 or response.status_code >= 500:
+            # HackerRank is struggling; keep the stored values
+            return None
         else:
             return {
                 "rating": 0,
@@ -279,40 +445,75 @@ def fetch_hackerrank_data(handle):
         print(f"Error fetching HackerRank data for {handle}: {e}")
     return None
 
+TASKS_SOLVED_RE = re.compile("Tasks Solved")
+
+def parse_atcoder_solved(html):
+    """
+    Extracts the "Tasks Solved" count from an AtCoder profile page (0 if absent
+    or unparseable).
+    Pages without the label skip parsing entirely.
+    """
+    pos = html.find("Tasks Solved")
+    if pos == -1:
+        return 0
+
+    doc = _lxml_document(html)
+    if doc is not None:
+        td_val = _first(doc.xpath('(//text()[contains(., "Tasks Solved")])[1]/following::td[1]'))
+        if td_val is not None:
+            try:
+                return int(td_val.text_content().split()[0])
+            except (ValueError, IndexError):
+                pass
+        return 0
+
+    # Without lxml, only <table> elements are parsed, unless the label's first
+    # occurrence is outside a table, in which case the whole page is parsed
+    from bs4 import BeautifulSoup, SoupStrainer
+    in_table = html.rfind('<table', 0, pos) > html.rfind('</table', 0, pos)
+    strainer = SoupStrainer('table') if in_table else None
+    soup = BeautifulSoup(html, 'html.parser', parse_only=strainer)
+    solved_tag = soup.find(string=TASKS_SOLVED_RE)
+    if solved_tag:
+        td_val = solved_tag.find_next('td')
+        if td_val:
+            try:
+                return int(td_val.text.split()[0])
+            except (ValueError, IndexError):
+                pass
+    return 0
+
 def fetch_atcoder_data(handle):
     """
     Fetches AtCoder data from kenkoooo wrapper and scrapes profile for solved count.
     """
     url = f"https://atcoder.jp/users/{handle}/history/json"
     try:
-        response = requests.get(url, headers=DEFAULT_HEADERS, timeout=10)
+        response = http_get(url, headers=DEFAULT_HEADERS, timeout=10)
         history = response.json()
         if response.status_code == 200 and history:
             latest = history[-1]
             
             # Scrape profile for total solved problems
-            recent_problems = 0
+            # (None if the profile could not be fetched, so the stored count is kept)
+            recent_problems = None
             try:
                 profile_url = f"https://atcoder.jp/users/{handle}"
-                p_resp = requests.get(profile_url, headers=DEFAULT_HEADERS, timeout=10)
+                p_resp = http_get(profile_url, headers=DEFAULT_HEADERS, timeout=10)
                 if p_resp.status_code == 200:
-                    soup = BeautifulSoup(p_resp.text, 'html.parser')
-                    # Look for Tasks Solved
-                    solved_tag = soup.find(string=re.compile("Tasks Solved"))
-                    if solved_tag:
-                        td_val = solved_tag.find_next('td')
-                        if td_val:
-                            recent_problems = int(td_val.text.split()[0])
+                    recent_problems = parse_atcoder_solved(p_resp.text)
             except: pass
 
-            return {
+            data = {
                 "rating": latest.get("NewRating", 0),
                 "rank": "AtCoder",
                 "global_rank": latest.get("Place", 0),
                 "country_rank": 0,
-                "recent_problems": recent_problems,
                 "total_contests": len(history)
             }
+            if recent_problems is not None:
+                data["recent_problems"] = recent_problems
+            return data
     except Exception as e:
         print(f"Error fetching AtCoder data for {handle}: {e}")
     return None
@@ -347,9 +548,10 @@ def extract_handle_from_url(url, platform):
         
     return None
 
-def fetch_user_data(url, platform):
+def fetch_user_data(url, platform, sync=None):
     """
     General function to fetch user data based on platform.
+    `sync` is the stored Codeforces solved-problem state, if any.
     """
     handle = extract_handle_from_url(url, platform)
     if not handle:
@@ -360,7 +562,7 @@ def fetch_user_data(url, platform):
     p = platform.lower()
     try:
         if p == "codeforces":
-            return fetch_codeforces_data(handle)
+            return fetch_codeforces_data(handle, sync=sync)
         elif p == "leetcode":
             return fetch_leetcode_data(handle)
         elif p == "codechef":
@@ -1,15 +1,41 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, send_file
-from models import db, User
-from api_utils import fetch_user_data
-from excel_utils import update_excel, get_excel_path
-from flask_apscheduler import APScheduler
+from flask import (
+    Flask, render_template, request, redirect, url_for, flash, send_file, jsonify, session, make_response,
+    Response, stream_with_context, abort,
+)
+from models import db, User, UserRanking, CodeforcesSync, RatingHistory, ensure_schema, get_data_version, bump_data_version
+from events_utils import ChangeFeed, publish, user_update, latest_event_id, prune_events
+from ranking_utils import rank_user, rank_users, unrank_user, rebuild_rankings, user_standing, scope_size
+from api_utils import fetch_user_data, extract_handle_from_url
+from refresh_utils import fetch_all_users_data
+from http_utils import circuit_states, open_circuits
+from scheduler_utils import RefreshScheduler, acquire_scheduler_lock, SCHEDULER_TICK_SECONDS
+from queue_utils import worker_id, claim_jobs, complete_jobs, queue_stats
+from cache_utils import response_cache
+from import_utils import parse_roster, normalize_roster, RosterError
+from history_utils import rating_history, latest_before, delete_history, window_start
+from excel_utils import update_excel, schedule_excel_update, get_excel_path
+from metrics_utils import timer, render_metrics
+from export_utils import stream_export, ExportUnavailable, EXPORT_FORMATS, EXPORT_CHUNK_ROWS
+from db_utils import (
+    sqlite_engine_options, configure_sqlite, user_changes, write_refresh_results,
+    REFRESH_COLUMNS, USER_DATA_DEFAULTS,
+)
+from sqlalchemy import select, update, or_
 import os
+import math
+import time
+import zlib
+import click
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 app = Flask(__name__)
 
 # Use /tmp for DB on Render (read-only filesystem elsewhere)
-if os.environ.get('RENDER'):
+if os.environ.get('DATABASE_PATH'):
+    DB_PATH = os.path.abspath(os.environ['DATABASE_PATH'])
+elif os.environ.get('RENDER'):
     DB_PATH = '/tmp/database.db'
 else:
     # Use instance folder locally
@@ -20,36 +46,366 @@ else:
 
 app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{DB_PATH}'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = sqlite_engine_options()
 app.config['SECRET_KEY'] = 'your-secret-key'
 
 db.init_app(app)
-scheduler = APScheduler()
+scheduler = None
 
-# Ensure DB tables exist when app is imported (works with gunicorn on Render)
 with app.app_context():
-    db.create_all()
+    configure_sqlite(db.engine)
 
-def update_all_users():
+# The schema is checked on first use rather than at import, so a cold start
+# serves its first request sooner
+_db_ready = False
+_db_ready_lock = threading.Lock()
+
+def ensure_db():
+    """Creates or upgrades the schema once per process."""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_ready_lock:
+        if not _db_ready:
+            with app.app_context():
+                if ensure_schema():
+                    # New or changed tables: (re)materialize the rankings
+                    rebuild_rankings()
+                    db.session.commit()
+            _db_ready = True
+
+@app.before_request
+def prepare_db():
+    ensure_db()
+
+PLATFORMS = ["Codeforces", "LeetCode", "CodeChef", "AtCoder", "HackerRank"]
+LEADERBOARD_PAGE_SIZE = int(os.environ.get('LEADERBOARD_PAGE_SIZE', 50))
+
+# Only the columns index.html renders
+LEADERBOARD_COLUMNS = (
+    User.id, User.name, User.platform, User.profile_url, User.rating, User.rank,
+    User.global_rank, User.country_rank, User.recent_problems, User.total_contests,
+    User.last_updated, UserRanking.score,
+)
+
+class LeaderboardCache:
+    """
+    Rendered leaderboard pages for the current data version, per worker.
+    The version lives in the DB and is bumped by every write, so a worker
+    never serves a page rendered from older data than the latest commit.
+    """
+
+    def __init__(self, max_pages=256):
+        self.max_pages = max_pages
+        self.version = None
+        self.pages = {}
+
+    def get(self, version, key):
+        if version != self.version:
+            return None
+        return self.pages.get(key)
+
+    def put(self, version, key, html):
+        if version != self.version:
+            self.version, self.pages = version, {}
+        if len(self.pages) < self.max_pages:
+            self.pages[key] = html
+
+_leaderboard_cache = LeaderboardCache()
+
+def leaderboard_page(platform=None, start=1, limit=LEADERBOARD_PAGE_SIZE):
+    """
+    Returns (rows, next_start) for the page of `limit` users from rank `start`:
+    by rating on one platform, or by normalized score across all of them.
+    Ranks are materialized in user_ranking, so any page is one index range
+    scan, however deep.
+    """
+    if platform:
+        position = UserRanking.platform_rank
+        query = select(*LEADERBOARD_COLUMNS, position.label('position')).where(UserRanking.platform == platform)
+    else:
+        position = UserRanking.overall_rank
+        query = select(*LEADERBOARD_COLUMNS, position.label('position'))
+    query = query.join(UserRanking, UserRanking.user_id == User.id) \
+        .where(position >= start).order_by(position).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    next_start = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_start = rows[-1].position + 1
+    return rows, next_start
+
+def apply_user_data(user, data):
+    """
+    Copies fetched data onto `user` (see user_changes for which fields change),
+    recording a history snapshot if anything changed. Returns the changed fields.
+    """
+    changes = user_changes({field: getattr(user, field) for field in USER_DATA_DEFAULTS}, data)
+    for field, value in changes.items():
+        setattr(user, field, value)
+    user.last_updated = user.last_attempt = datetime.utcnow()
+    user.status = 'ready'
+    if user.id is None or any(field in changes for field in RatingHistory.TRACKED_FIELDS):
+        db.session.add(RatingHistory.snapshot(user))
+    sync = data.get('codeforces_sync')
+    if sync:
+        save_codeforces_sync(sync)
+    return changes
+
+def load_codeforces_sync(users):
+    """Returns the stored solved-problem state of the given users' Codeforces handles."""
+    handles = set()
+    for user in users:
+        if user.platform.lower() == 'codeforces':
+            handle = extract_handle_from_url(user.profile_url, user.platform)
+            if handle:
+                handles.add(handle.lower())
+    if not handles:
+        return {}
+    rows = CodeforcesSync.query.filter(CodeforcesSync.handle.in_(handles)).all()
+    return {row.handle: row.to_state() for row in rows}
+
+def save_codeforces_sync(sync):
+    row = db.session.get(CodeforcesSync, sync['handle']) or CodeforcesSync(handle=sync['handle'])
+    row.last_submission_id = sync['last_submission_id']
+    row.solved = ",".join(sorted(sync['solved']))
+    db.session.add(row)
+
+def export_excel():
+    """Background job for schedule_excel_update: writes the current roster."""
+    with app.app_context(), timer("contest_stage_seconds", stage="excel_export"):
+        update_excel(User.query.filter_by(status='ready').all())
+
+# Fetches for new registrations and leaderboard refresh clicks, off the request thread
+BACKGROUND_WORKERS = int(os.environ.get('BACKGROUND_WORKERS', 4))
+background_pool = ThreadPoolExecutor(max_workers=BACKGROUND_WORKERS, thread_name_prefix="background")
+
+def _logged(func, *args):
+    try:
+        return func(*args)
+    except Exception as e:
+        print(f"Error in background {func.__name__} {args}: {e}")
+
+def run_in_background(func, *args):
+    """Submits `func(*args)` to background_pool; its errors are printed, not lost in the future."""
+    return background_pool.submit(_logged, func, *args)
+
+def _lock_and_reload(user_id):
+    """
+    Takes the write lock, then re-reads the user, so a delete that happened
+    while fetching is seen here rather than failing the write. Returns None
+    (with the transaction rolled back) if the user is gone.
+    """
+    bump_data_version()
+    user = db.session.get(User, user_id, populate_existing=True)
+    if user is None:
+        db.session.rollback()
+    return user
+
+def complete_registration(user_id):
+    """Fetches a pending user's initial data, marking them ready or failed."""
+    with app.app_context():
+        user = db.session.get(User, user_id)
+        if user is None or user.status != 'pending':
+            return
+        sync = load_codeforces_sync([user])
+        # End the read transaction before going to the network
+        db.session.commit()
+        try:
+            data = fetch_user_data(user.profile_url, user.platform, sync=next(iter(sync.values()), None))
+        except Exception as e:
+            print(f"Error completing registration for user {user_id}: {e}")
+            data = None
+        if data:
+            user = _lock_and_reload(user_id)
+            if user is None or user.status != 'pending':
+                db.session.rollback()
+                return
+            apply_user_data(user, data)
+            rank_user(user.id, user.platform, user.rating)
+            publish("insert", {"ids": [user.id]})
+            with timer("contest_stage_seconds", stage="db_commit"):
+                db.session.commit()
+            schedule_excel_update(export_excel)
+        else:
+            db.session.execute(update(User).where(User.id == user_id, User.status == 'pending')
+                               .values(status='failed', last_attempt=datetime.utcnow()))
+            db.session.commit()
+
+def refresh_user(user_id):
+    """
+    Fetches one user and writes the result. Returns False if the fetch failed
+    or the user was deleted meanwhile.
+    """
     with app.app_context():
-        users = User.query.all()
-        for user in users:
-            data = fetch_user_data(user.profile_url, user.platform)
-            if data:
-                user.rating = data.get('rating', 0)
-                user.rank = data.get('rank', 'Unrated')
-                user.global_rank = data.get('global_rank', 0)
-                user.country_rank = data.get('country_rank', 0)
-                user.recent_problems = data.get('recent_problems', 0)
-                user.total_contests = data.get('total_contests', 0)
-                user.last_updated = datetime.utcnow()
+        user = db.session.get(User, user_id)
+        if user is None:
+            return False
+        sync = load_codeforces_sync([user])
+        db.session.commit()  # no transaction open while fetching
+        data = fetch_user_data(user.profile_url, user.platform, sync=next(iter(sync.values()), None))
+        if not data:
+            # Counts as an attempt, so the queue does not put this user first again
+            db.session.execute(update(User).where(User.id == user_id).values(last_attempt=datetime.utcnow()))
+            db.session.commit()
+            return False
+        user = _lock_and_reload(user_id)
+        if user is None:
+            return False
+        changes = apply_user_data(user, data)
+        rank_user(user.id, user.platform, user.rating)
+        publish("update", user_update(user.id, changes, user.last_updated))
         db.session.commit()
-        update_excel(users)
-        print(f"Daily update completed: {datetime.now()}")
+        if changes:
+            schedule_excel_update(export_excel)
+        return True
+
+def refresh_users(users):
+    """
+    Fetches `users` (rows of REFRESH_COLUMNS) concurrently, then writes only
+    what changed. No transaction is open while the fetches run.
+    """
+    sync = load_codeforces_sync(users)
+    db.session.commit()
+    with timer("contest_stage_seconds", stage="fetch"):
+        results = fetch_all_users_data([(u.id, u.profile_url, u.platform) for u in users], codeforces_sync=sync)
+    with timer("contest_stage_seconds", stage="db_commit"):
+        changed = write_refresh_results(users, results, sync, datetime.utcnow())
+    if changed:
+        schedule_excel_update(export_excel)
+    prune_events()
+    db.session.commit()
+
+def update_all_users():
+    """Refreshes every ready or pending user in one go (the benchmarks use this)."""
+    ensure_db()
+    with app.app_context():
+        # Pending users are included so registrations lost on a restart still resolve
+        users = db.session.execute(select(*REFRESH_COLUMNS).where(User.status.in_(('ready', 'pending')))).all()
+        refresh_users(users)
+        print(f"Full refresh of {len(users)} users completed: {datetime.now()}")
+
+refresh_scheduler = RefreshScheduler()
+
+def refresh_stalest(owner=None):
+    """
+    Scheduler tick: leases jobs from the shared refresh queue, as many per
+    platform as its request budget allows right now, and refreshes those
+    users. Each cycle queues every user once, stalest first, so any number
+    of processes can run this without fetching a profile twice.
+    """
+    ensure_db()
+    owner = owner or worker_id()
+    with app.app_context():
+        planned = refresh_scheduler.plan()
+        jobs = []
+        for platform in PLATFORMS:
+            jobs.extend(claim_jobs(owner, platform, planned.get(platform.lower(), 0)))
+        refreshed = {}
+        if jobs:
+            # Users deleted since they were queued are skipped
+            users = db.session.execute(
+                select(*REFRESH_COLUMNS)
+                .where(User.id.in_([user_id for _, user_id in jobs]), User.status.in_(('ready', 'pending')))
+            ).all()
+            for user in users:
+                refreshed[user.platform.lower()] = refreshed.get(user.platform.lower(), 0) + 1
+            # If this raises, the jobs stay leased and are retried when the lease expires
+            if users:
+                refresh_users(users)
+            done = complete_jobs(owner, [job_id for job_id, _ in jobs])
+            db.session.commit()
+            if done < len(jobs):
+                print(f"Scheduler: {len(jobs) - done} leases expired before their jobs finished")
+            print(f"Scheduler refreshed {len(users)} users: {refreshed}")
+        refresh_scheduler.settle(planned, refreshed)
+
+def start_scheduler():
+    """
+    Starts the refresh scheduler in at most one web process per host; other
+    gunicorn workers find the lock taken and skip it. The queue would make
+    concurrent ticks safe, but each one spends its own request budget; run
+    `flask refresh-worker` processes to add throughput deliberately.
+    SCHEDULER_ENABLED=0 turns it off (e.g. for scripts that only import the app).
+    """
+    global _scheduler_lock, scheduler
+    if os.environ.get('SCHEDULER_ENABLED', '1') != '1':
+        return
+    _scheduler_lock = acquire_scheduler_lock(os.path.join(os.path.dirname(DB_PATH), 'scheduler.lock'))
+    if _scheduler_lock is None:
+        return
+    from flask_apscheduler import APScheduler
+    scheduler = APScheduler()
+    scheduler.add_job(id='refresh_stalest', func=refresh_stalest, trigger='interval',
+                      seconds=SCHEDULER_TICK_SECONDS, max_instances=1, coalesce=True)
+    scheduler.start()
+
+_scheduler_lock = None
+
+# Seconds after startup before the scheduler is started in the background,
+# so it does not compete with the first requests after a cold boot
+SCHEDULER_START_DELAY = float(os.environ.get('SCHEDULER_START_DELAY', 5))
+
+def start_scheduler_later():
+    global _scheduler_timer
+    _scheduler_timer = threading.Timer(SCHEDULER_START_DELAY, start_scheduler)
+    _scheduler_timer.daemon = True
+    _scheduler_timer.start()
+
+_scheduler_timer = None
+
+@app.cli.command('refresh-worker')
+@click.option('--once', is_flag=True, help='Run a single batch and exit.')
+@click.option('--interval', default=SCHEDULER_TICK_SECONDS, show_default=True,
+              help='Seconds between batches.')
+def refresh_worker(once, interval):
+    """Claims and runs jobs from the shared refresh queue until stopped."""
+    if _scheduler_timer is not None:
+        # This process is the worker; it does not also run the web scheduler
+        _scheduler_timer.cancel()
+    owner = worker_id()
+    print(f"Refresh worker {owner} started")
+    while True:
+        refresh_stalest(owner)
+        if once:
+            break
+        time.sleep(interval)
 
 @app.route('/')
 def index():
-    users = User.query.order_by(User.rating.desc()).all()
-    return render_template('index.html', users=users)
+    platform = request.args.get('platform')
+    if platform not in PLATFORMS:
+        platform = None
+    limit = min(max(request.args.get('limit', LEADERBOARD_PAGE_SIZE, type=int), 1), 200)
+    start = max(request.args.get('start', 1, type=int), 1)
+
+    # Pages with pending flash messages are rendered fresh and never cached
+    cacheable = not session.get('_flashes')
+    version = get_data_version()
+    # The page shows a banner for open circuits, so their state is part of the key
+    cache_key = request.query_string + b"|" + ",".join(open_circuits()).encode()
+    etag = f"lb-{version}-{zlib.crc32(cache_key):x}"
+    if cacheable and etag in request.if_none_match:
+        response = make_response('', 304)
+    else:
+        html = _leaderboard_cache.get(version, cache_key) if cacheable else None
+        if html is None:
+            # Read first: the page then includes at least everything up to this event
+            since = latest_event_id()
+            users, next_start = leaderboard_page(platform=platform, start=start, limit=limit)
+            with timer("contest_stage_seconds", stage="template_render"):
+                html = render_template(
+                    'index.html', users=users, platforms=PLATFORMS, platform=platform,
+                    start=start, limit=limit, next_start=next_start, since=since,
+                )
+            if cacheable:
+                _leaderboard_cache.put(version, cache_key, html)
+        response = make_response(html)
+    if cacheable:
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/register', methods=['GET', 'POST'])
 def register():
@@ -62,70 +418,176 @@ def register():
             flash('All fields are required!', 'danger')
             return redirect(url_for('register'))
 
-        # Check if user already exists
+        # Check if user already exists (a failed registration may be retried)
         existing_user = User.query.filter_by(profile_url=profile_url).first()
-        if existing_user:
+        if existing_user and existing_user.status != 'failed':
             flash('Profile URL already registered!', 'warning')
             return redirect(url_for('register'))
 
-        # Fetch initial data
-        data = fetch_user_data(profile_url, platform)
-        if not data:
-            flash('Invalid Profile URL or could not fetch data.', 'danger')
-            return redirect(url_for('register'))
-
-        new_user = User(
-            name=name,
-            platform=platform,
-            profile_url=profile_url,
-            rating=data.get('rating', 0),
-            rank=data.get('rank', 'Unrated'),
-            global_rank=data.get('global_rank', 0),
-            country_rank=data.get('country_rank', 0),
-            recent_problems=data.get('recent_problems', 0),
-            total_contests=data.get('total_contests', 0)
-        )
+        new_user = existing_user or User(profile_url=profile_url)
+        new_user.name = name
+        new_user.platform = platform
+        new_user.status = 'pending'
         db.session.add(new_user)
         db.session.commit()
-        
-        # Update Excel
-        update_excel(User.query.all())
-        
-        flash('Registration successful!', 'success')
-        return redirect(url_for('index'))
 
-    return render_template('register.html')
+        # Fetch initial data in the background; register.html polls its status
+        run_in_background(complete_registration, new_user.id)
+        return redirect(url_for('register', pending=new_user.id))
+
+    pending_user = None
+    pending_id = request.args.get('pending', type=int)
+    if pending_id:
+        pending_user = db.session.get(User, pending_id)
+    return render_template('register.html', pending_user=pending_user)
+
+@app.route('/register/status/<int:user_id>')
+def registration_status(user_id):
+    user = db.session.get(User, user_id)
+    if user is None:
+        return jsonify({"id": user_id, "status": "missing"}), 404
+    return jsonify({"id": user.id, "name": user.name, "status": user.status})
+
+def import_roster(rows):
+    """
+    Imports normalized roster rows: dedupes them against existing users by
+    (platform, handle) and by profile_url in one query, fetches initial data
+    concurrently, inserts every valid user in a single transaction and
+    schedules one Excel export. Like /register, a row matching a failed
+    registration reuses that user. Fills in each row's "result" and "message".
+    """
+    candidates = [r for r in rows if "result" not in r]
+    platforms = {r["platform"] for r in candidates}
+    urls = {r["profile_url"] for r in candidates}
+    by_handle, by_url = {}, {}
+    if candidates:
+        # Stored URLs vary (trailing slashes, /u/ prefixes), so compare handles;
+        # profile_url is unique across platforms, so compare it exactly as well
+        for user_id, platform, url, status in db.session.execute(
+            select(User.id, User.platform, User.profile_url, User.status)
+            .where(or_(User.platform.in_(platforms), User.profile_url.in_(urls)))
+        ):
+            by_url[url] = (user_id, status)
+            handle = extract_handle_from_url(url, platform)
+            if handle:
+                by_handle[(platform, handle.lower())] = (user_id, status)
+    reused = {}  # row number -> id of the failed registration it replaces
+    for row in candidates:
+        matches = {m for m in (by_url.get(row["profile_url"]),
+                               by_handle.get((row["platform"], row["handle"].lower()))) if m}
+        if not matches:
+            continue
+        user_id, status = by_url.get(row["profile_url"]) or next(iter(matches))
+        if any(s != 'failed' for _, s in matches) or user_id in reused.values():
+            row.update(result="duplicate", message="Already registered")
+        else:
+            reused[row["row"]] = user_id
+    candidates = [r for r in candidates if "result" not in r]
+
+    new_users = {r["row"]: User(name=r["name"], platform=r["platform"], profile_url=r["profile_url"]) for r in candidates}
+    users = list(new_users.values())
+    sync = load_codeforces_sync(users)
+    db.session.commit()  # no transaction open while fetching
+    results = fetch_all_users_data(
+        [(row_no, u.profile_url, u.platform) for row_no, u in new_users.items()],
+        codeforces_sync=sync,
+    )
+
+    added = []
+    for row in candidates:
+        data = results.get(row["row"])
+        if not data:
+            row.update(result="failed", message="Could not fetch data")
+            continue
+        user = new_users[row["row"]]
+        previous = db.session.get(User, reused[row["row"]]) if row["row"] in reused else None
+        if previous is not None:
+            previous.name, previous.platform, previous.profile_url = row["name"], row["platform"], row["profile_url"]
+            user = previous
+        apply_user_data(user, data)
+        db.session.add(user)
+        row.update(result="added", message=f"Rating {user.rating}")
+        added.append(user)
+    if added:
+        db.session.flush()
+        rank_users([(user.id, user.platform, user.rating) for user in added])
+        publish("insert", {"ids": [user.id for user in added]})
+        bump_data_version()
+        db.session.commit()
+        schedule_excel_update(export_excel)
+    return rows
+
+@app.route('/import', methods=['GET', 'POST'])
+def bulk_import():
+    if request.method == 'GET':
+        return render_template('import.html', results=None)
 
-@app.route('/refresh/<int:user_id>')
+    upload = request.files.get('file')
+    try:
+        if upload and upload.filename:
+            rows = parse_roster(upload.filename, upload.read())
+        elif request.is_json:
+            rows = parse_roster('roster.json', request.get_data())
+        else:
+            raise RosterError("Upload a CSV or JSON roster")
+    except RosterError as e:
+        if request.is_json:
+            return jsonify({"error": str(e)}), 400
+        flash(str(e), 'danger')
+        return redirect(url_for('bulk_import'))
+
+    results = import_roster(normalize_roster(rows, PLATFORMS))
+    report = [{k: r.get(k) for k in ("row", "name", "platform", "profile_url", "result", "message")} for r in results]
+    if request.is_json:
+        return jsonify(report)
+    return render_template('import.html', results=report)
+
+@app.route('/refresh/<int:user_id>', methods=['GET', 'POST'])
 def refresh(user_id):
     user = User.query.get_or_404(user_id)
-    data = fetch_user_data(user.profile_url, user.platform)
-    if data:
-        user.rating = data.get('rating', 0)
-        user.rank = data.get('rank', 'Unrated')
-        user.global_rank = data.get('global_rank', 0)
-        user.country_rank = data.get('country_rank', 0)
-        user.recent_problems = data.get('recent_problems', 0)
-        user.total_contests = data.get('total_contests', 0)
-        user.last_updated = datetime.utcnow()
-        db.session.commit()
-        update_excel(User.query.all())
-        flash(f'Updated data for {user.name}', 'success')
+    name = user.name
+    db.session.commit()
+    if request.method == 'POST':
+        # The page gets the result over /events
+        run_in_background(refresh_user, user_id)
+        return jsonify({"status": "queued", "id": user_id}), 202
+    if refresh_user(user_id):
+        flash(f'Updated data for {name}', 'success')
     else:
         flash('Failed to update data.', 'danger')
     return redirect(url_for('index'))
 
-@app.route('/delete/<int:user_id>')
+@app.route('/delete/<int:user_id>', methods=['GET', 'POST'])
 def delete_user(user_id):
     user = User.query.get_or_404(user_id)
     name = user.name
+    delete_history(user.id)
+    unrank_user(user.id)
     db.session.delete(user)
+    publish("delete", {"id": user_id})
+    bump_data_version()
     db.session.commit()
     # Update Excel after deletion
-    update_excel(User.query.all())
+    schedule_excel_update(export_excel)
+    if request.method == 'POST':
+        return jsonify({"status": "deleted", "id": user_id})
     flash(f'User {name} deleted successfully.', 'success')
     return redirect(url_for('index'))
 
+change_feed = ChangeFeed(app)
+
+@app.route('/events')
+def events():
+    """Server-sent events with leaderboard deltas newer than Last-Event-ID (or ?since=)."""
+    after = request.headers.get('Last-Event-ID', request.args.get('since'))
+    try:
+        after = int(after)
+    except (TypeError, ValueError):
+        after = change_feed.current_id()
+    db.session.remove()  # the stream holds no connection
+    return Response(stream_with_context(change_feed.stream(after)), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @app.route('/download')
 def download():
     path = get_excel_path()
@@ -134,8 +596,136 @@ def download():
     flash('Excel file not generated yet.', 'info')
     return redirect(url_for('index'))
 
+# Columns of the streaming exports, in output order
+EXPORT_COLUMNS = {
+    "users": (
+        User.id, User.name, User.platform, User.profile_url, User.rating, User.rank, User.global_rank,
+        User.country_rank, User.recent_problems, User.total_contests, User.last_updated,
+    ),
+    "history": (
+        RatingHistory.user_id, RatingHistory.ts, RatingHistory.rating, RatingHistory.global_rank,
+        RatingHistory.recent_problems, RatingHistory.total_contests,
+    ),
+}
+
+def requested_days(default=30):
+    """?days= as a finite, non-negative number, or None if it is not one."""
+    days = request.args.get('days', default, type=float)
+    if not math.isfinite(days) or days < 0:
+        return None
+    return days
+
+@app.route('/export/<dataset>.<fmt>')
+def export(dataset, fmt):
+    """
+    Streams ready users (?platform=) or rating history (?days=, ?user_id=) as
+    csv, ndjson or parquet, straight from a cursor over the table.
+    """
+    if dataset not in EXPORT_COLUMNS or fmt not in EXPORT_FORMATS:
+        abort(404)
+    columns = EXPORT_COLUMNS[dataset]
+    query = select(*columns)
+    if dataset == "users":
+        query = query.where(User.status == 'ready')
+        if request.args.get('platform') in PLATFORMS:
+            query = query.where(User.platform == request.args['platform'])
+        query = query.order_by(User.id)
+    else:
+        if 'days' in request.args:
+            days = requested_days()
+            if days is None:
+                return jsonify({"error": "days must be a non-negative number"}), 400
+            query = query.where(RatingHistory.ts >= window_start(days))
+        if 'user_id' in request.args:
+            query = query.where(RatingHistory.user_id == request.args.get('user_id', type=int))
+        query = query.order_by(RatingHistory.user_id, RatingHistory.ts)
+
+    rows = db.session.execute(query.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+    try:
+        body = stream_export(fmt, columns, rows)
+    except ExportUnavailable as e:
+        rows.close()
+        return jsonify({"error": str(e)}), 501
+    return Response(stream_with_context(body), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={dataset}.{fmt}',
+    })
+
+@app.route('/history')
+@app.route('/history/<int:user_id>')
+def history(user_id=None):
+    """Rating over the last N days (?days=, default 30) for one user or everyone."""
+    days = requested_days()
+    if days is None:
+        return jsonify({"error": "days must be a non-negative number"}), 400
+    if user_id is not None:
+        User.query.get_or_404(user_id)
+    points = rating_history(days, user_id=user_id)
+    result = {"days": days, "users": {str(uid): pts for uid, pts in points.items()}}
+    if user_id is not None:
+        # Rating at the start of the window, so flat stretches still chart
+        base = latest_before(user_id, window_start(days))
+        result["baseline"] = base.rating if base else None
+    return jsonify(result)
+
+@app.route('/rankings')
+def rankings():
+    """Top users by normalized score, or by rating on ?platform=, from rank ?start= (default 1)."""
+    platform = request.args.get('platform')
+    if platform and platform not in PLATFORMS:
+        return jsonify({"error": f"Unknown platform {platform}"}), 400
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 200)
+    start = max(request.args.get('start', 1, type=int), 1)
+    rows, next_start = leaderboard_page(platform=platform, start=start, limit=limit)
+    return jsonify({
+        "platform": platform,
+        "size": scope_size(platform),
+        "next_start": next_start,
+        "users": [
+            {"rank": r.position, "id": r.id, "name": r.name, "platform": r.platform,
+             "rating": r.rating, "score": r.score}
+            for r in rows
+        ],
+    })
+
+@app.route('/rankings/<int:user_id>')
+def user_ranking(user_id):
+    """A user's rank and percentile on their platform and their overall rank."""
+    standing = user_standing(user_id)
+    if standing is None:
+        return jsonify({"id": user_id, "error": "not ranked"}), 404
+    return jsonify(standing)
+
+@app.route('/cache/stats')
+def cache_stats():
+    return jsonify(response_cache.get_stats())
+
+@app.context_processor
+def inject_circuits():
+    return {"open_circuits": open_circuits()}
+
+@app.route('/circuits')
+def circuits():
+    return jsonify(circuit_states())
+
+@app.route('/scheduler/stats')
+def scheduler_stats():
+    """This process's request budgets, plus job counts of the shared queue."""
+    stats = refresh_scheduler.get_stats()
+    for platform, states in queue_stats().items():
+        stats.setdefault(platform.lower(), {})["queue"] = states
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus text format, summed over all worker processes."""
+    return render_metrics(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+if __name__ != '__main__':
+    # gunicorn / flask run
+    start_scheduler_later()
+
 if __name__ == '__main__':
-    # Setup scheduler only when running locally (not under gunicorn)
-    scheduler.add_job(id='daily_update', func=update_all_users, trigger='interval', days=1)
-    scheduler.start()
+    # The debug reloader runs this file twice; only the serving child schedules
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler_later()
     app.run(debug=True)
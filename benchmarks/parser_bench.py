@@ -0,0 +1,136 @@
+"""
+Microbenchmark for the CodeChef/AtCoder profile scrapers.
+
+Checks that the parsers in api_utils return exactly what the original
+full-page BeautifulSoup parsers returned for every saved fixture page, both
+with lxml (the default when installed) and with the SoupStrainer fallback,
+then times all three. Run from the repo root:
+
+    python benchmarks/parser_bench.py [--repeat N]
+"""
+import os
+import re
+import sys
+import time
+import argparse
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import api_utils
+from api_utils import parse_codechef_profile, parse_atcoder_solved, CODECHEF_CONTESTS_RE
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+
+def legacy_codechef(html):
+    """The original fetch_codechef_data scrape, verbatim apart from returning a tuple."""
+    soup = BeautifulSoup(html, 'html.parser')
+    rating_div = soup.find('div', class_='rating-number')
+    rating = int(rating_div.text) if rating_div else 0
+
+    stars_span = soup.find('span', class_='rating')
+    stars = stars_span.text if stars_span else "Unrated"
+
+    global_rank = 0
+    country_rank = 0
+    rank_list = soup.find('div', class_='rating-ranks')
+    if rank_list:
+        ranks = rank_list.find_all('strong')
+        if len(ranks) >= 2:
+            global_rank = int(ranks[0].text) if ranks[0].text.isdigit() else 0
+            country_rank = int(ranks[1].text) if ranks[1].text.isdigit() else 0
+
+    total_contests = 0
+    recent_problems = 0
+    contest_matches = re.findall(r'(\d+)\s+Contests', html)
+    if contest_matches:
+        total_contests = int(contest_matches[0])
+
+    solved_section = soup.find('section', class_='problems-solved')
+    if solved_section:
+        try:
+            h3_text = solved_section.find('h3').text
+            count_match = re.search(r'\((\d+)\)', h3_text)
+            if count_match:
+                recent_problems = int(count_match.group(1))
+        except: pass
+
+    return rating, stars, global_rank, country_rank, recent_problems, total_contests
+
+def fast_codechef(html):
+    total_contests = 0
+    contest_match = CODECHEF_CONTESTS_RE.search(html)
+    if contest_match:
+        total_contests = int(contest_match.group(1))
+    return parse_codechef_profile(html) + (total_contests,)
+
+def legacy_atcoder(html):
+    """The original fetch_atcoder_data profile scrape."""
+    recent_problems = 0
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+        solved_tag = soup.find(string=re.compile("Tasks Solved"))
+        if solved_tag:
+            td_val = solved_tag.find_next('td')
+            if td_val:
+                recent_problems = int(td_val.text.split()[0])
+    except: pass
+    return recent_problems
+
+PARSERS = {
+    "codechef": (legacy_codechef, fast_codechef),
+    "atcoder": (legacy_atcoder, parse_atcoder_solved),
+}
+
+def without_lxml(func):
+    """Runs `func` with api_utils falling back to the BeautifulSoup strainer path."""
+    def run(html):
+        saved, api_utils.lxml_html = api_utils.lxml_html, None
+        try:
+            return func(html)
+        finally:
+            api_utils.lxml_html = saved
+    return run
+
+def timed(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) / repeat * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20, help='runs per parser per fixture')
+    args = parser.parse_args()
+
+    if api_utils.lxml_html is None:
+        print("lxml is not installed; the 'lxml' column falls back to the strainer path")
+
+    failures = 0
+    print(f"{'fixture':<26}{'KB':>7}{'legacy ms':>11}{'lxml ms':>9}{'strainer ms':>13}{'speedup':>9}  output")
+    for name in sorted(os.listdir(FIXTURES)):
+        platform = name.split('_')[0]
+        if platform not in PARSERS:
+            continue
+        with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+            html = f.read()
+        legacy, fast = PARSERS[platform]
+        strained = without_lxml(fast)
+        expected = legacy(html)
+        mismatches = [
+            f"{label} {result}" for label, result in (("lxml", fast(html)), ("strainer", strained(html)))
+            if result != expected
+        ]
+        failures += bool(mismatches)
+        legacy_ms = timed(legacy, html, args.repeat)
+        fast_ms = timed(fast, html, args.repeat)
+        strained_ms = timed(strained, html, args.repeat)
+        status = f"MISMATCH expected {expected}, got {'; '.join(mismatches)}" if mismatches else "same"
+        print(f"{name:<26}{len(html) / 1024:>7.1f}{legacy_ms:>11.2f}{fast_ms:>9.2f}{strained_ms:>13.2f}"
+              f"{legacy_ms / fast_ms:>8.1f}x  {status}")
+
+    if failures:
+        print(f"{failures} fixture(s) produced different output")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,280 @@
+"""
+Local stand-in for every upstream endpoint used by api_utils.
+
+Replays the recorded payloads in benchmarks/recordings (and the HTML pages in
+benchmarks/fixtures) for any handle, so refreshes can be benchmarked without
+touching the real sites. Point the app at it with UPSTREAM_BASE_URL; requests
+arrive as /<original host>/<original path>. Run from the repo root:
+
+    python benchmarks/replay_server.py [--port 8765] [--latency-ms 50] [--error-rate 0.01]
+
+Handles starting with "missing" are answered the way each site answers an
+unknown user.
+"""
+import os
+import re
+import copy
+import json
+import time
+import random
+import zlib
+import argparse
+from urllib.parse import urlsplit, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RECORDINGS = os.path.join(HERE, 'recordings')
+FIXTURES = os.path.join(HERE, 'fixtures')
+
+# Sizes of the generated histories; every handle gets the same shape
+RATING_CHANGES = 60
+SUBMISSIONS = 400
+
+def _load_json(name):
+    with open(os.path.join(RECORDINGS, name), encoding='utf-8') as f:
+        return json.load(f)
+
+def _load_html(name):
+    with open(os.path.join(FIXTURES, name), encoding='utf-8') as f:
+        return f.read()
+
+def _missing(handle):
+    return handle.lower().startswith('missing')
+
+def _seed(handle):
+    """Stable per-handle number so ratings differ between users but not between runs."""
+    return zlib.crc32(handle.lower().encode('utf-8'))
+
+class Recordings:
+    """Builds responses for arbitrary handles from the recorded samples."""
+
+    def __init__(self):
+        self.cf_info = _load_json('codeforces_user_info.json')
+        self.cf_rating = _load_json('codeforces_user_rating.json')
+        self.cf_submission = _load_json('codeforces_user_status.json')
+        self.leetcode = _load_json('leetcode_user.json')
+        self.codechef_api = _load_json('codechef_api.json')
+        self.atcoder_change = _load_json('atcoder_history.json')
+        self.hackerrank = _load_json('hackerrank_profile.json')
+        self.codechef_page = _load_html('codechef_profile.html')
+        self.atcoder_page = _load_html('atcoder_profile.html')
+
+    def codeforces_info(self, handle):
+        info = dict(self.cf_info, handle=handle)
+        info["rating"] = 1200 + _seed(handle) % 2000
+        return info
+
+    def codeforces_rating(self, handle):
+        changes = []
+        for i in range(RATING_CHANGES):
+            change = dict(self.cf_rating, handle=handle, contestId=i + 1, rank=1 + (_seed(handle) + i) % 5000)
+            changes.append(change)
+        return changes
+
+    def codeforces_status(self, handle, start, count):
+        # Newest first, like the real API; ids count down from SUBMISSIONS
+        subs = []
+        for n in range(start, min(start + count, SUBMISSIONS + 1)):
+            sub_id = SUBMISSIONS - n + 1
+            sub = copy.deepcopy(self.cf_submission)
+            sub["id"] = sub_id
+            sub["problem"]["contestId"] = 1 + sub_id // 5
+            sub["problem"]["index"] = "ABCDE"[sub_id % 5]
+            sub["verdict"] = "OK" if sub_id % 3 else "WRONG_ANSWER"
+            subs.append(sub)
+        return subs
+
+    def leetcode_user(self, handle):
+        user = copy.deepcopy(self.leetcode)
+        user["userContestRanking"]["rating"] = 1400 + _seed(handle) % 1500 + 0.5
+        return user
+
+    def codechef(self, handle):
+        data = dict(self.codechef_api, name=handle)
+        data["currentRating"] = 1000 + _seed(handle) % 2000
+        return data
+
+    def atcoder_history(self, handle):
+        return [
+            dict(self.atcoder_change, Place=1 + (_seed(handle) + i) % 8000, NewRating=400 + (_seed(handle) + i) % 2400)
+            for i in range(RATING_CHANGES)
+        ]
+
+    def hackerrank_profile(self, handle):
+        data = copy.deepcopy(self.hackerrank)
+        data["model"]["username"] = handle
+        return data
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    recordings = None
+    latency = 0.0
+    jitter = 0.0
+    error_rate = 0.0
+    timeout_rate = 0.0
+    host_latency = {}
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self._handle(None)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b""
+        self._handle(body)
+
+    def _handle(self, body):
+        host, _, rest = self.path.lstrip('/').partition('/')
+        parts = urlsplit('/' + rest)
+        delay = self.host_latency.get(host, self.latency)
+        if self.jitter:
+            delay += random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+        if self.timeout_rate and random.random() < self.timeout_rate:
+            # Longer than any client timeout in api_utils; the client gives up first
+            time.sleep(30)
+            return self._send(504, "text/plain", b"timeout")
+        if self.error_rate and random.random() < self.error_rate:
+            return self._send(503, "text/plain", b"injected error")
+        try:
+            status, payload = self._route(host, parts.path, parse_qs(parts.query), body)
+        except Exception as e:
+            status, payload = 500, f"replay error: {e}"
+        if isinstance(payload, str):
+            content_type = "text/html; charset=utf-8"
+            data = payload.encode('utf-8')
+        else:
+            content_type = "application/json"
+            data = json.dumps(payload).encode('utf-8')
+        self._send(status, content_type, data)
+
+    def _send(self, status, content_type, data):
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _route(self, host, path, query, body):
+        rec = self.recordings
+        arg = lambda name, default="": query.get(name, [default])[0]
+
+        if host == "codeforces.com":
+            if path == "/api/user.info":
+                handles = [h for h in arg("handles").split(';') if h]
+                for h in handles:
+                    if _missing(h):
+                        return 400, {"status": "FAILED", "comment": f"handles: User with handle {h} not found"}
+                return 200, {"status": "OK", "result": [rec.codeforces_info(h) for h in handles]}
+            handle = arg("handle")
+            if _missing(handle):
+                return 400, {"status": "FAILED", "comment": f"handle: User with handle {handle} not found"}
+            if path == "/api/user.rating":
+                return 200, {"status": "OK", "result": rec.codeforces_rating(handle)}
+            if path == "/api/user.status":
+                start, count = int(arg("from", "1")), int(arg("count", "10"))
+                return 200, {"status": "OK", "result": rec.codeforces_status(handle, start, count)}
+
+        elif host == "leetcode.com" and path == "/graphql":
+            request = json.loads(body or b"{}")
+            query, variables = request.get("query", ""), request.get("variables", {})
+            data, errors = {}, []
+            # Each aliased userContestRanking/matchedUser pair is answered under its alias
+            # (r<i>/m<i> in batches); unaliased queries get the plain field names
+            aliases = re.findall(r"(\w+): userContestRanking\(username: \$(\w+)\)", query)
+            if aliases:
+                for ranking_alias, var in aliases:
+                    matched_alias = re.search(rf"(\w+): matchedUser\(username: \${var}\)", query).group(1)
+                    handle = variables.get(var, "")
+                    if _missing(handle):
+                        data[ranking_alias] = data[matched_alias] = None
+                        errors.append({"message": "That user does not exist.", "path": [matched_alias]})
+                    else:
+                        user = rec.leetcode_user(handle)
+                        data[ranking_alias] = user["userContestRanking"]
+                        data[matched_alias] = user["matchedUser"]
+            else:
+                handle = next(iter(variables.values()), "")
+                if _missing(handle):
+                    data = {"userContestRanking": None, "matchedUser": None}
+                    errors.append({"message": "That user does not exist."})
+                else:
+                    data = rec.leetcode_user(handle)
+            return 200, {"data": data, "errors": errors} if errors else {"data": data}
+
+        elif host == "codechef-api.vercel.app":
+            handle = path.strip('/')
+            if _missing(handle):
+                return 200, {"success": False, "status": "failed"}
+            return 200, rec.codechef(handle)
+
+        elif host == "www.codechef.com" and path.startswith("/users/"):
+            if _missing(path.rsplit('/', 1)[-1]):
+                return 404, "<html><body>Not found</body></html>"
+            return 200, rec.codechef_page
+
+        elif host == "atcoder.jp" and path.startswith("/users/"):
+            handle = path.split('/')[2]
+            if path.endswith("/history/json"):
+                return 200, [] if _missing(handle) else rec.atcoder_history(handle)
+            if _missing(handle):
+                return 404, "<html><body>Not found</body></html>"
+            return 200, rec.atcoder_page
+
+        elif host == "www.hackerrank.com" and path.startswith("/rest/contests/master/users/"):
+            handle = path.split('/')[5]
+            if _missing(handle):
+                return 404, {"model": None}
+            return 200, rec.hackerrank_profile(handle)
+
+        return 404, {"error": f"no recording for {host}{path}"}
+
+def make_server(port=0, latency_ms=0, jitter_ms=0, error_rate=0.0, timeout_rate=0.0, host_latency_ms=None):
+    """Returns a ThreadingHTTPServer (not yet serving) configured with the given faults."""
+    handler = type("ConfiguredReplayHandler", (ReplayHandler,), {
+        "recordings": Recordings(),
+        "latency": latency_ms / 1000,
+        "jitter": jitter_ms / 1000,
+        "error_rate": error_rate,
+        "timeout_rate": timeout_rate,
+        "host_latency": {h: ms / 1000 for h, ms in (host_latency_ms or {}).items()},
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    server.daemon_threads = True
+    return server
+
+def parse_host_latency(values):
+    """Parses repeated --host-latency host=ms options into a dict."""
+    result = {}
+    for value in values or []:
+        host, _, ms = value.partition('=')
+        result[host] = float(ms)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0, help='fixed delay added to every response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='extra uniform random delay, 0..N ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of requests answered with 503')
+    parser.add_argument('--timeout-rate', type=float, default=0, help='fraction of requests that never answer in time')
+    parser.add_argument('--host-latency', action='append', metavar='HOST=MS',
+                        help='per-host delay overriding --latency-ms, e.g. www.codechef.com=400')
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.latency_ms, args.jitter_ms, args.error_rate,
+                         args.timeout_rate, parse_host_latency(args.host_latency))
+    print(f"Replay server listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,300 @@
+"""
+End-to-end benchmark for refresh, registration and the leaderboard page.
+
+Starts the replay server (benchmarks/replay_server.py) in-process, then for
+each roster size runs a fresh worker process that imports the app against a
+throwaway database, seeds the roster across all five platforms and drives:
+
+    refresh         update_all_users() over the whole roster
+    register        POST /register, then waits until every registration is ready
+    index_render    GET / with the page cache cleared before every request
+    index_cached    GET / served from the per-worker page cache
+
+Reports throughput, p50/p99 latency and peak memory. For refresh the latency
+is per upstream HTTP request; for the others it is per app request (register
+also reports the time until all registrations were ready). Run from the repo root:
+
+    python benchmarks/run_bench.py [--sizes 100,1000,10000] [--latency-ms 50] [--json out.json]
+"""
+import os
+import sys
+import json
+import time
+import random
+import resource
+import argparse
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+from replay_server import make_server, parse_host_latency
+
+SCENARIOS = ["refresh", "register", "index_render", "index_cached"]
+
+PROFILE_URLS = {
+    "Codeforces": "https://codeforces.com/profile/{}",
+    "LeetCode": "https://leetcode.com/u/{}/",
+    "CodeChef": "https://www.codechef.com/users/{}",
+    "AtCoder": "https://atcoder.jp/users/{}",
+    "HackerRank": "https://www.hackerrank.com/profile/{}",
+}
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+class Recorder:
+    """Collects latencies and memory peaks for one scenario."""
+
+    def __init__(self, use_tracemalloc):
+        self.use_tracemalloc = use_tracemalloc
+        self.latencies = []
+        self.lock = threading.Lock()
+
+    def add(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def __enter__(self):
+        if self.use_tracemalloc:
+            tracemalloc.reset_peak()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.started
+
+    def result(self, ops, **extra):
+        result = {
+            "ops": ops,
+            "seconds": round(self.elapsed, 3),
+            "throughput": round(ops / self.elapsed, 1) if self.elapsed else 0.0,
+            "p50_ms": round(percentile(self.latencies, 50) * 1000, 2),
+            "p99_ms": round(percentile(self.latencies, 99) * 1000, 2),
+            # ru_maxrss is KB on Linux; it is the process peak so far, so it only grows
+            "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        }
+        if self.use_tracemalloc:
+            result["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+        result.update(extra)
+        return result
+
+def seed_users(app_module, size, missing_rate):
+    """Inserts `size` ready users spread evenly over the platforms."""
+    from sqlalchemy import insert
+    from models import db, User, bump_data_version
+    from ranking_utils import rebuild_rankings
+
+    rng = random.Random(size)
+    rows = []
+    for i in range(size):
+        platform = app_module.PLATFORMS[i % len(app_module.PLATFORMS)]
+        handle = f"missing{i}" if rng.random() < missing_rate else f"bench{i}"
+        rows.append({
+            "name": f"Bench User {i}", "platform": platform,
+            "profile_url": PROFILE_URLS[platform].format(handle),
+            "rating": 0, "rank": "Unrated", "global_rank": 0, "country_rank": 0,
+            "recent_problems": 0, "total_contests": 0,
+            "last_updated": datetime(2000, 1, 1), "status": "ready",
+        })
+    app_module.ensure_db()
+    with app_module.app.app_context():
+        db.session.execute(insert(User), rows)
+        rebuild_rankings()
+        bump_data_version()
+        db.session.commit()
+
+def run_refresh(app_module, args, recorder):
+    import http_utils
+    from models import db, User
+
+    original = http_utils._request
+    def timed_request(method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            return original(method, url, **kwargs)
+        finally:
+            recorder.add(time.perf_counter() - start)
+
+    http_utils._request = timed_request
+    try:
+        started = datetime.utcnow()
+        with recorder:
+            app_module.update_all_users()
+    finally:
+        http_utils._request = original
+    with app_module.app.app_context():
+        refreshed = db.session.query(User).filter(User.last_updated >= started).count()
+    return recorder.result(args.size, refreshed=refreshed, upstream_requests=len(recorder.latencies))
+
+def run_register(app_module, args, recorder):
+    from models import db, User
+
+    count = min(args.registrations, args.size)
+    client = app_module.app.test_client()
+    ids = []
+    with recorder:
+        for i in range(count):
+            platform = app_module.PLATFORMS[i % len(app_module.PLATFORMS)]
+            start = time.perf_counter()
+            response = client.post('/register', data={
+                "name": f"Registered {i}", "platform": platform,
+                "profile_url": PROFILE_URLS[platform].format(f"reg{i}"),
+            })
+            recorder.add(time.perf_counter() - start)
+            pending = response.headers.get('Location', '').rpartition('pending=')[2]
+            if pending.isdigit():
+                ids.append(int(pending))
+        posted = time.perf_counter() - recorder.started
+        # Registrations finish in the background pool; wait for all of them
+        deadline = time.monotonic() + args.register_timeout
+        with app_module.app.app_context():
+            while time.monotonic() < deadline:
+                waiting = db.session.query(User).filter(User.id.in_(ids), User.status == 'pending').count()
+                db.session.rollback()
+                if not waiting:
+                    break
+                time.sleep(0.05)
+            ready = db.session.query(User).filter(User.id.in_(ids), User.status == 'ready').count()
+    return recorder.result(count, posted_s=round(posted, 3), ready=ready)
+
+def run_index(app_module, args, recorder, cached):
+    client = app_module.app.test_client()
+    paths = ["/"] + [f"/?platform={p}" for p in app_module.PLATFORMS]
+    for path in paths:
+        client.get(path)
+    with recorder:
+        for i in range(args.index_requests):
+            if not cached:
+                app_module._leaderboard_cache.version = None
+            start = time.perf_counter()
+            response = client.get(paths[i % len(paths)])
+            recorder.add(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise RuntimeError(f"GET {paths[i % len(paths)]} returned {response.status_code}")
+    return recorder.result(args.index_requests)
+
+def worker(args):
+    """Runs every scenario for one roster size; the app is imported fresh per size."""
+    if args.tracemalloc:
+        tracemalloc.start()
+    sys.path.insert(0, os.path.dirname(HERE))
+    import app as app_module
+
+    seed_users(app_module, args.size, args.missing_rate)
+    results = {}
+    for scenario in args.scenarios:
+        recorder = Recorder(args.tracemalloc)
+        if scenario == "refresh":
+            results[scenario] = run_refresh(app_module, args, recorder)
+        elif scenario == "register":
+            results[scenario] = run_register(app_module, args, recorder)
+        elif scenario in ("index_render", "index_cached"):
+            results[scenario] = run_index(app_module, args, recorder, cached=scenario == "index_cached")
+    with open(args.out, 'w') as f:
+        json.dump(results, f)
+
+def run_size(args, size, upstream):
+    """Runs the worker for one size in a clean process and returns its results."""
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        out = os.path.join(tmp, "results.json")
+        env = dict(
+            os.environ,
+            UPSTREAM_BASE_URL=upstream,
+            SCHEDULER_ENABLED="0",
+            DATABASE_PATH=os.path.join(tmp, "database.db"),
+            HTTP_CACHE_DB=os.path.join(tmp, "http_cache.db"),
+            METRICS_DIR=os.path.join(tmp, "metrics"),
+            EXCEL_FILE=os.path.join(tmp, "contest_data.xlsx"),
+            HTTP_CACHE_ENABLED="1" if args.cache else "0",
+        )
+        cmd = [
+            sys.executable, os.path.abspath(__file__), "--worker",
+            "--size", str(size), "--out", out,
+            "--scenarios", ",".join(args.scenarios),
+            "--registrations", str(args.registrations),
+            "--register-timeout", str(args.register_timeout),
+            "--index-requests", str(args.index_requests),
+            "--missing-rate", str(args.missing_rate),
+        ]
+        if args.tracemalloc:
+            cmd.append("--tracemalloc")
+        # The app prints a line per fetch; keep it out of the report unless asked
+        output = None if args.verbose else subprocess.DEVNULL
+        subprocess.run(cmd, env=env, check=True, stdout=output, stderr=output if output is None else subprocess.PIPE)
+        with open(out) as f:
+            return json.load(f)
+
+def print_report(report):
+    print(f"{'size':>6}  {'scenario':<14}{'ops':>7}{'secs':>9}{'ops/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'rss MB':>9}  notes")
+    for size, results in report["results"].items():
+        for scenario, r in results.items():
+            notes = ", ".join(
+                f"{k}={v}" for k, v in r.items()
+                if k not in ("ops", "seconds", "throughput", "p50_ms", "p99_ms", "peak_rss_mb")
+            )
+            print(f"{size:>6}  {scenario:<14}{r['ops']:>7}{r['seconds']:>9.2f}{r['throughput']:>10.1f}"
+                  f"{r['p50_ms']:>10.2f}{r['p99_ms']:>10.2f}{r['peak_rss_mb']:>9.1f}  {notes}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default="100,1000", help='comma-separated roster sizes, e.g. 100,1000,10000')
+    parser.add_argument('--scenarios', default=",".join(SCENARIOS), help=f'subset of {",".join(SCENARIOS)}')
+    parser.add_argument('--registrations', type=int, default=100, help='registrations per size (capped at the size)')
+    parser.add_argument('--register-timeout', type=float, default=120, help='seconds to wait for registrations')
+    parser.add_argument('--index-requests', type=int, default=200, help='leaderboard requests per index scenario')
+    parser.add_argument('--missing-rate', type=float, default=0.0, help='fraction of seeded handles that do not exist')
+    parser.add_argument('--latency-ms', type=float, default=0, help='replay server delay per response')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='extra uniform random delay, 0..N ms')
+    parser.add_argument('--error-rate', type=float, default=0, help='fraction of upstream requests answered with 503')
+    parser.add_argument('--timeout-rate', type=float, default=0, help='fraction of upstream requests that time out')
+    parser.add_argument('--host-latency', action='append', metavar='HOST=MS', help='per-host delay override')
+    parser.add_argument('--cache', action='store_true', help='keep the HTTP response cache enabled')
+    parser.add_argument('--tracemalloc', action='store_true', help='also report Python heap peaks (slower)')
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    parser.add_argument('--verbose', action='store_true', help='show the app output')
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--out', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.scenarios = [s for s in args.scenarios.split(',') if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if args.worker:
+        return worker(args)
+
+    server = make_server(0, args.latency_ms, args.jitter_ms, args.error_rate,
+                         args.timeout_rate, parse_host_latency(args.host_latency))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    upstream = f"http://127.0.0.1:{server.server_address[1]}"
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k not in ("worker", "size", "out", "json", "verbose")},
+        "results": {},
+    }
+    try:
+        for size in [int(s) for s in args.sizes.split(',') if s]:
+            print(f"Running size {size}...", flush=True)
+            try:
+                report["results"][size] = run_size(args, size, upstream)
+            except subprocess.CalledProcessError as e:
+                print(f"Size {size} failed:\n{(e.stderr or b'').decode(errors='replace')[-2000:]}")
+                sys.exit(1)
+    finally:
+        server.shutdown()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
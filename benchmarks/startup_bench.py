@@ -0,0 +1,132 @@
+"""
+Cold-start benchmark: how long a fresh process takes to serve its first page.
+
+Each run starts a new Python process against a throwaway database and measures:
+
+    import          `import app`
+    first_get       the first GET / through the test client (schema check,
+                    first DB connection, template compile)
+    process_ttfb    spawning gunicorn (or `flask run` with --server flask)
+                    until GET / first answers 200, i.e. what a request
+                    waking a sleeping free-tier instance waits for
+
+Both a fresh database (first boot) and an existing one (a restart) are
+measured. Run from the repo root:
+
+    python benchmarks/startup_bench.py [--runs 5] [--server gunicorn|flask]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/')
+served = time.perf_counter()
+assert response.status_code == 200, response.status_code
+print(json.dumps({{"import": imported - start, "first_get": served - imported, "modules": len(sys.modules)}}))
+"""
+
+def app_env(tmp):
+    return dict(
+        os.environ,
+        SCHEDULER_ENABLED="0",
+        DATABASE_PATH=os.path.join(tmp, "database.db"),
+        HTTP_CACHE_DB=os.path.join(tmp, "http_cache.db"),
+        METRICS_DIR=os.path.join(tmp, "metrics"),
+        EXCEL_FILE=os.path.join(tmp, "contest_data.xlsx"),
+    )
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def in_process(tmp):
+    """Import and first-request timings, measured inside a fresh interpreter."""
+    out = subprocess.run([sys.executable, "-c", CHILD.format(root=ROOT)], env=app_env(tmp),
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+def process_ttfb(tmp, server, timeout=60):
+    """Seconds from spawning the server until GET / returns 200."""
+    port = free_port()
+    if server == "gunicorn":
+        cmd = [sys.executable, "-m", "gunicorn", "-w", "1", "-b", f"127.0.0.1:{port}", "app:app"]
+    else:
+        cmd = [sys.executable, "-m", "flask", "--app", "app", "run", "--port", str(port)]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=app_env(tmp), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{server} exited with {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=timeout) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.005)
+        raise RuntimeError(f"{server} did not answer within {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+def summarize(samples):
+    return {"median_ms": round(statistics.median(samples) * 1000, 1), "min_ms": round(min(samples) * 1000, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per measurement')
+    parser.add_argument('--server', choices=("gunicorn", "flask"), default="gunicorn")
+    parser.add_argument('--json', metavar='PATH', help='also write the results as JSON')
+    args = parser.parse_args()
+
+    report = {}
+    for db_state in ("fresh", "existing"):
+        samples = {"import": [], "first_get": [], "process_ttfb": []}
+        modules = 0
+        for _ in range(args.runs):
+            tmp = tempfile.mkdtemp(prefix="startup-")
+            try:
+                if db_state == "existing":
+                    in_process(tmp)  # creates the schema; the timed runs below reuse it
+                timings = in_process(tmp)
+                samples["import"].append(timings["import"])
+                samples["first_get"].append(timings["first_get"])
+                modules = timings["modules"]
+                if db_state == "fresh":
+                    # A new directory so the server also starts without a schema
+                    shutil.rmtree(tmp)
+                    tmp = tempfile.mkdtemp(prefix="startup-")
+                samples["process_ttfb"].append(process_ttfb(tmp, args.server))
+            finally:
+                shutil.rmtree(tmp, ignore_errors=True)
+        report[db_state] = {name: summarize(values) for name, values in samples.items()}
+        report[db_state]["modules_loaded"] = modules
+
+    print(f"{'database':<10}{'measure':<15}{'median ms':>11}{'min ms':>9}")
+    for db_state, results in report.items():
+        for name in ("import", "first_get", "process_ttfb"):
+            print(f"{db_state:<10}{name:<15}{results[name]['median_ms']:>11.1f}{results[name]['min_ms']:>9.1f}")
+        print(f"{db_state:<10}{'modules loaded':<15}{results['modules_loaded']:>11}")
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,240 @@
+import os
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Stored next to the app DB so it survives restarts
+if os.environ.get('HTTP_CACHE_DB'):
+    CACHE_DB_PATH = os.environ['HTTP_CACHE_DB']
+elif os.environ.get('RENDER'):
+    CACHE_DB_PATH = '/tmp/http_cache.db'
+else:
+    CACHE_DB_PATH = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'http_cache.db')
+
+CACHE_ENABLED = os.environ.get('HTTP_CACHE_ENABLED', '1') == '1'
+CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', 50 * 1024 * 1024))
+# Seconds to wait on another process's write lock before giving up on the cache
+CACHE_BUSY_TIMEOUT = float(os.environ.get('HTTP_CACHE_BUSY_TIMEOUT', 5))
+# A hit only rewrites last_access when the stored one is older than this, so
+# most reads stay reads; LRU eviction does not need finer resolution
+CACHE_ACCESS_RESOLUTION = float(os.environ.get('HTTP_CACHE_ACCESS_RESOLUTION', 300))
+
+# (endpoint name, URL pattern, TTL in seconds). First match wins; URLs that
+# match nothing are never cached.
+ENDPOINT_TTLS = [
+    ("codeforces.user.info", r"codeforces\.com/api/user\.info", 600),
+    ("codeforces.user.rating", r"codeforces\.com/api/user\.rating", 3600),
+    ("codeforces.user.status", r"codeforces\.com/api/user\.status", 600),
+    ("leetcode.graphql", r"leetcode\.com/graphql", 600),
+    ("codechef.api", r"codechef-api\.vercel\.app/", 1800),
+    ("codechef.profile", r"codechef\.com/users/", 1800),
+    ("atcoder.history", r"atcoder\.jp/users/[^/]+/history/json", 3600),
+    ("atcoder.profile", r"atcoder\.jp/users/", 3600),
+    ("hackerrank.profile", r"hackerrank\.com/rest/", 1800),
+]
+ENDPOINT_TTLS = [
+    (name, re.compile(pattern), int(os.environ.get(f"TTL_{name.upper().replace('.', '_')}", ttl)))
+    for name, pattern, ttl in ENDPOINT_TTLS
+]
+
+def endpoint_for(url):
+    """Returns (endpoint name, TTL) for a URL, or (None, None) if it is not cacheable."""
+    for name, pattern, ttl in ENDPOINT_TTLS:
+        if pattern.search(url):
+            return name, ttl
+    return None, None
+
+class CachedResponse:
+    """Minimal stand-in for requests.Response, built from a cache entry."""
+
+    def __init__(self, status_code, content, encoding):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.from_cache = True
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+class ResponseCache:
+    """
+    TTL + LRU response cache backed by SQLite.
+    Entries past their TTL are kept (until evicted) so they can be revalidated
+    with If-None-Match / If-Modified-Since. The file is shared by every worker
+    process; a lookup or store that hits a SQLite error is logged and treated
+    as a miss, so the request goes to the network instead of failing.
+    """
+
+    def __init__(self, path, max_bytes):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._conn = None
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0, "bytes_saved": 0}
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=CACHE_BUSY_TIMEOUT, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expires_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_access ON responses (last_access)")
+            self._conn = conn  # only once set up, so a failed open is retried
+        return self._conn
+
+    @staticmethod
+    def make_key(method, url, body=None):
+        if body is not None and not isinstance(body, (str, bytes)):
+            body = json.dumps(body, sort_keys=True)
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        h = hashlib.sha1(f"{method} {url}\n".encode('utf-8'))
+        if body:
+            h.update(body)
+        return h.hexdigest()
+
+    def get(self, key):
+        """Returns the entry as a dict (with a `fresh` flag), or None."""
+        try:
+            with self._lock:
+                row = self._db().execute(
+                    "SELECT status, body, encoding, etag, last_modified, expires_at, last_access "
+                    "FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    return None
+                now = time.time()
+                if now - row[6] > CACHE_ACCESS_RESOLUTION:
+                    self._db().execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                    self._db().commit()
+        except sqlite3.Error as e:
+            print(f"HTTP cache lookup failed: {e}")
+            return None
+        status, body, encoding, etag, last_modified, expires_at, _ = row
+        return {
+            "status": status, "body": body, "encoding": encoding, "etag": etag,
+            "last_modified": last_modified, "fresh": expires_at > now,
+        }
+
+    def put(self, key, url, response, ttl):
+        body = response.content
+        now = time.time()
+        with self._lock:
+            try:
+                db = self._db()
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, url, response.status_code, body, response.encoding,
+                     response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                     now + ttl, now, len(body)))
+                self._evict(db)
+                db.commit()
+            except sqlite3.Error as e:
+                self._rollback()
+                print(f"HTTP cache store failed: {e}")
+                return
+            self.stats["stores"] += 1
+
+    def touch(self, key, ttl):
+        """Extends the TTL of an entry after a 304 revalidation."""
+        with self._lock:
+            now = time.time()
+            try:
+                self._db().execute(
+                    "UPDATE responses SET expires_at = ?, last_access = ? WHERE key = ?", (now + ttl, now, key))
+                self._db().commit()
+            except sqlite3.Error as e:
+                self._rollback()
+                print(f"HTTP cache update failed: {e}")
+
+    def _rollback(self):
+        if self._conn is not None:
+            try:
+                self._conn.rollback()
+            except sqlite3.Error:
+                pass
+
+    def _evict(self, db):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in db.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+            db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self.stats["evictions"] += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def record(self, stat, saved_bytes=0):
+        with self._lock:
+            self.stats[stat] += 1
+            self.stats["bytes_saved"] += saved_bytes
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            row = self._db().execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        stats["entries"], stats["size_bytes"] = row
+        stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["revalidated"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM responses")
+            self._db().commit()
+
+response_cache = ResponseCache(CACHE_DB_PATH, CACHE_MAX_BYTES)
+
+def cached_request(session, method, url, **kwargs):
+    """
+    Sends a request through `session`, serving it from the response cache when
+    a fresh entry exists and revalidating stale entries with ETag/Last-Modified.
+    Only 200 responses from endpoints listed in ENDPOINT_TTLS are cached.
+    """
+    _, ttl = endpoint_for(url)
+    if not CACHE_ENABLED or ttl is None:
+        return session.request(method, url, **kwargs)
+
+    key = ResponseCache.make_key(method, url, kwargs.get('json', kwargs.get('data')))
+    entry = response_cache.get(key)
+    if entry and entry["fresh"]:
+        response_cache.record("hits", len(entry["body"]))
+        return CachedResponse(entry["status"], entry["body"], entry["encoding"])
+
+    headers = dict(kwargs.pop('headers', None) or {})
+    if entry:
+        if entry["etag"]:
+            headers['If-None-Match'] = entry["etag"]
+        if entry["last_modified"]:
+            headers['If-Modified-Since'] = entry["last_modified"]
+
+    response = session.request(method, url, headers=headers, **kwargs)
+    if response.status_code == 304 and entry:
+        response_cache.touch(key, ttl)
+        response_cache.record("revalidated", len(entry["body"]))
+        return CachedResponse(entry["status"], entry["body"], entry["encoding"])
+
+    response_cache.record("misses")
+    if response.status_code == 200:
+        response_cache.put(key, url, response, ttl)
+    return response
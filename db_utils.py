@@ -0,0 +1,170 @@
+import os
+import time
+from sqlalchemy import event, select, update, insert, bindparam
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from models import db, User, RatingHistory, CodeforcesSync, bump_data_version
+from events_utils import change_row, publish_many, user_update, format_timestamp
+from ranking_utils import rank_users
+
+# SQLite tuning. WAL lets readers (e.g. GET /) run while a refresh writes;
+# synchronous=NORMAL is durable across app crashes in WAL mode and only
+# risks the last commits on power loss. Writers wait up to the busy timeout
+# for the lock instead of failing with "database is locked".
+DB_BUSY_TIMEOUT_MS = int(os.environ.get('DB_BUSY_TIMEOUT_MS', 5000))
+DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+
+# Users written per refresh transaction; keeps each write lock short
+DB_WRITE_CHUNK = int(os.environ.get('DB_WRITE_CHUNK', 500))
+
+# Fetched User columns and the value a missing stored value counts as
+USER_DATA_DEFAULTS = {
+    "rating": 0,
+    "rank": "Unrated",
+    "global_rank": 0,
+    "country_rank": 0,
+    "recent_problems": 0,
+    "total_contests": 0,
+}
+
+# What refresh_users needs from each user: enough to fetch and to diff
+REFRESH_COLUMNS = (User.id, User.profile_url, User.platform, User.status) + tuple(
+    getattr(User, field) for field in USER_DATA_DEFAULTS
+)
+
+def sqlite_engine_options():
+    """SQLALCHEMY_ENGINE_OPTIONS for the app's SQLite database."""
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "connect_args": {"timeout": DB_BUSY_TIMEOUT_MS / 1000, "check_same_thread": False},
+    }
+
+def configure_sqlite(engine):
+    """Applies the WAL/synchronous/busy_timeout pragmas to every new connection."""
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout = {DB_BUSY_TIMEOUT_MS}")
+        cursor.execute("PRAGMA journal_mode = WAL")
+        cursor.execute(f"PRAGMA synchronous = {DB_SYNCHRONOUS}")
+        cursor.close()
+
+def user_changes(stored, data):
+    """
+    Returns {column: new value} for the fetched values that differ from
+    `stored`. Fields missing from `data` (e.g. a failed secondary scrape)
+    keep their stored value.
+    """
+    changes = {}
+    for field, default in USER_DATA_DEFAULTS.items():
+        current = stored.get(field)
+        new = data.get(field, default if current is None else current)
+        if new != current:
+            changes[field] = new
+    return changes
+
+def _sync_changed(old, new):
+    return old is None or old["last_submission_id"] != new["last_submission_id"] or old["solved"] != new["solved"]
+
+def write_refresh_results(rows, results, codeforces_sync, now):
+    """
+    Writes a refresh of `rows` (REFRESH_COLUMNS rows; only their ids are
+    used) in DB_WRITE_CHUNK-sized transactions, issuing only real changes:
+    - users whose values changed get their changed columns, in one
+      executemany per set of changed columns, plus a history snapshot if a
+      tracked field moved
+    - users fetched without changes only get last_updated/last_attempt, in a
+      single UPDATE ... WHERE id IN (...)
+    - users whose fetch failed only get last_attempt
+    - Codeforces solved state is upserted only for handles where it moved
+    Fetched values are compared with the users as they are inside the write
+    transaction, so users deleted or refreshed while the fetch ran are
+    skipped or diffed against their new values, never reverted.
+    Each chunk also moves users whose rating changed (or who just became
+    ready) in the rankings and publishes its deltas to the change feed.
+    Returns the number of users whose values changed.
+    """
+    users = User.__table__
+    changed = 0
+    for start in range(0, len(rows), DB_WRITE_CHUNK):
+        ids = [row.id for row in rows[start:start + DB_WRITE_CHUNK]]
+        fetched = [user_id for user_id in ids if results.get(user_id)]
+        failed = [user_id for user_id in ids if not results.get(user_id)]
+        current = {}
+        if fetched:
+            # Written first so the chunk holds the write lock from here on:
+            # nobody can delete or refresh these users between the read below
+            # and the writes that follow it
+            bump_data_version()
+            current = {row.id: row for row in db.session.execute(
+                select(*REFRESH_COLUMNS).where(User.id.in_(fetched))
+            )}
+
+        updates, history, unchanged, syncs = {}, [], [], {}
+        events, inserted, ranked = [], [], []
+        for user_id in fetched:
+            row = current.get(user_id)
+            if row is None:
+                continue  # deleted while fetching
+            data = results[user_id]
+            stored = row._mapping
+            changes = user_changes(stored, data)
+            if changes or row.status != 'ready':
+                # Grouped by changed columns, so each UPDATE sets only those
+                params = {f"new_{field}": value for field, value in changes.items()}
+                updates.setdefault(tuple(sorted(changes)), []).append(dict(params, user_id=row.id))
+                if row.status == 'ready':
+                    events.append(change_row("update", user_update(row.id, changes, now)))
+                else:
+                    # Pending users were not on the leaderboard yet
+                    inserted.append(row.id)
+                values = {field: changes.get(field, stored[field]) for field in USER_DATA_DEFAULTS}
+                if 'rating' in changes or row.status != 'ready':
+                    ranked.append((row.id, row.platform, values['rating']))
+                if any(field in changes for field in RatingHistory.TRACKED_FIELDS):
+                    history.append(dict(
+                        {field: values[field] or 0 for field in RatingHistory.TRACKED_FIELDS},
+                        user_id=row.id, ts=int(time.time()),
+                    ))
+            else:
+                unchanged.append(row.id)
+            sync = data.get('codeforces_sync')
+            if sync and _sync_changed(codeforces_sync.get(sync['handle']), sync):
+                syncs[sync['handle']] = {
+                    "handle": sync['handle'],
+                    "last_submission_id": sync['last_submission_id'],
+                    "solved": ",".join(sorted(sync['solved'])),
+                }
+
+        for fields, params in updates.items():
+            db.session.execute(
+                update(users).where(users.c.id == bindparam('user_id')).values(
+                    dict({field: bindparam(f"new_{field}") for field in fields},
+                         status='ready', last_updated=now, last_attempt=now)
+                ),
+                params,
+            )
+        if unchanged:
+            db.session.execute(update(User).where(User.id.in_(unchanged))
+                               .values(last_updated=now, last_attempt=now))
+        if failed:
+            db.session.execute(update(User).where(User.id.in_(failed)).values(last_attempt=now))
+        if history:
+            db.session.execute(insert(RatingHistory), history)
+        rank_users(ranked)
+        if inserted:
+            events.append(change_row("insert", {"ids": inserted}))
+        if unchanged:
+            events.append(change_row("touch", {"ids": unchanged, "last_updated": format_timestamp(now)}))
+        publish_many(events)
+        if syncs:
+            stmt = sqlite_insert(CodeforcesSync).values(list(syncs.values()))
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=[CodeforcesSync.handle],
+                set_={"last_submission_id": stmt.excluded.last_submission_id, "solved": stmt.excluded.solved},
+            ))
+        db.session.commit()
+        changed += sum(len(params) for params in updates.values())
+    return changed
@@ -0,0 +1,156 @@
+import os
+import json
+import time
+import threading
+from collections import deque
+from sqlalchemy import select, insert
+from models import db, ChangeEvent
+
+# Events older than this are deleted; a viewer away for longer reloads the page
+CHANGE_RETENTION_SECONDS = int(os.environ.get('CHANGE_RETENTION_SECONDS', 3600))
+# How often each worker checks the table for events written by any process
+SSE_POLL_SECONDS = float(os.environ.get('SSE_POLL_SECONDS', 1))
+# A stream ends after this long and the browser reconnects with Last-Event-ID,
+# so one viewer never holds a worker thread indefinitely
+SSE_STREAM_SECONDS = float(os.environ.get('SSE_STREAM_SECONDS', 55))
+SSE_HEARTBEAT_SECONDS = 15
+SSE_RETRY_MS = 2000
+# Open streams per worker process. Each holds a request thread, so keep this
+# below gunicorn's --threads; clients beyond it get whatever is new right
+# away and poll again after SSE_BUSY_RETRY_MS instead of holding a thread.
+SSE_MAX_STREAMS = int(os.environ.get('SSE_MAX_STREAMS', 4))
+SSE_BUSY_RETRY_MS = int(os.environ.get('SSE_BUSY_RETRY_MS', 10000))
+# Recent events kept in memory per worker for all of its streams
+FEED_BUFFER = 2000
+
+def format_timestamp(value):
+    """Formats last_updated the way index.html renders it."""
+    return value.strftime('%Y-%m-%d %H:%M') if value else None
+
+def change_row(kind, data):
+    return {"ts": int(time.time()), "kind": kind, "data": json.dumps(data, separators=(',', ':'))}
+
+def publish(kind, data):
+    """Adds an event to the current transaction; it is delivered once committed."""
+    db.session.add(ChangeEvent(**change_row(kind, data)))
+
+def publish_many(rows):
+    """Bulk variant of publish for rows built with change_row."""
+    if rows:
+        db.session.execute(insert(ChangeEvent), rows)
+
+def user_update(user_id, changes, last_updated):
+    """Delta for one user: only the changed fields plus the new last_updated."""
+    return dict(changes, id=user_id, last_updated=format_timestamp(last_updated))
+
+def latest_event_id():
+    """Id of the newest committed event; a page rendered now is current up to it."""
+    return db.session.execute(select(db.func.max(ChangeEvent.id))).scalar() or 0
+
+def prune_events():
+    db.session.execute(db.delete(ChangeEvent).where(ChangeEvent.ts < time.time() - CHANGE_RETENTION_SECONDS))
+
+class ChangeFeed:
+    """
+    Per-worker fan-out of the change_event table. One background thread polls
+    for new rows and wakes every open stream, so viewers cost no queries.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.cond = threading.Condition()
+        self.events = deque(maxlen=FEED_BUFFER)  # (id, kind, data)
+        self.last_id = None
+        self.floor = 0  # events at or below this id are no longer buffered
+        self.thread = None
+        self.slots = threading.BoundedSemaphore(SSE_MAX_STREAMS)
+
+    def _ensure_started(self):
+        with self.cond:
+            if self.thread is not None:
+                return
+            with self.app.app_context():
+                rows = db.session.execute(
+                    select(ChangeEvent.id, ChangeEvent.kind, ChangeEvent.data)
+                    .order_by(ChangeEvent.id.desc()).limit(FEED_BUFFER)
+                ).all()
+            rows.reverse()
+            self.events.extend(tuple(r) for r in rows)
+            self.last_id = rows[-1][0] if rows else 0
+            self.floor = rows[0][0] - 1 if len(rows) == FEED_BUFFER else 0
+            self.thread = threading.Thread(target=self._poll_loop, name="change-feed", daemon=True)
+            self.thread.start()
+
+    def _poll_loop(self):
+        while True:
+            time.sleep(SSE_POLL_SECONDS)
+            try:
+                with self.app.app_context():
+                    rows = db.session.execute(
+                        select(ChangeEvent.id, ChangeEvent.kind, ChangeEvent.data)
+                        .where(ChangeEvent.id > self.last_id).order_by(ChangeEvent.id).limit(FEED_BUFFER)
+                    ).all()
+            except Exception as e:
+                print(f"Error polling change events: {e}")
+                continue
+            if rows:
+                with self.cond:
+                    for row in rows:
+                        if len(self.events) == FEED_BUFFER:
+                            self.floor = self.events[0][0]
+                        self.events.append(tuple(row))
+                    self.last_id = rows[-1][0]
+                    self.cond.notify_all()
+
+    def current_id(self):
+        self._ensure_started()
+        return self.last_id
+
+    def wait(self, after, timeout):
+        """
+        Returns the events newer than `after`, waiting up to `timeout` seconds
+        for one. Returns None if some of them are no longer available.
+        """
+        self._ensure_started()
+        with self.cond:
+            if after < self.floor:
+                return None
+            self.cond.wait_for(lambda: self.last_id > after, timeout)
+            return [e for e in self.events if e[0] > after]
+
+    def stream(self, after):
+        """
+        Generator of server-sent-event text for one client, ending after
+        SSE_STREAM_SECONDS. When SSE_MAX_STREAMS streams are already open it
+        answers at once instead, as one poll.
+        """
+        if not self.slots.acquire(blocking=False):
+            yield from self._poll(after)
+            return
+        try:
+            # The id line lets the browser resume from here even if nothing arrives
+            yield f"retry: {SSE_RETRY_MS}\nid: {after}\n\n"
+            deadline = time.monotonic() + SSE_STREAM_SECONDS
+            while time.monotonic() < deadline:
+                events = self.wait(after, min(SSE_HEARTBEAT_SECONDS, max(deadline - time.monotonic(), 0)))
+                if events is None:
+                    yield "event: reset\ndata: {}\n\n"
+                    return
+                if not events:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format(events)
+                after = events[-1][0]
+        finally:
+            self.slots.release()
+
+    def _poll(self, after):
+        events = self.wait(after, 0)
+        if events is None:
+            yield "event: reset\ndata: {}\n\n"
+            return
+        # The browser reconnects after the retry delay with Last-Event-ID
+        yield f"retry: {SSE_BUSY_RETRY_MS}\nid: {after}\n\n" + _format(events)
+
+def _format(events):
+    return "".join(f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n" for event_id, kind, data in events)
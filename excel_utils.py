@@ -1,36 +1,114 @@
-import pandas as pd
 import os
+import time
+import atexit
+import tempfile
+import threading
 from datetime import datetime
 
-if os.environ.get('RENDER'):
+if os.environ.get('EXCEL_FILE'):
+    EXCEL_FILE = os.environ['EXCEL_FILE']
+elif os.environ.get('RENDER'):
     EXCEL_FILE = "/tmp/contest_data.xlsx"
 else:
     EXCEL_FILE = "contest_data.xlsx"
 
+# Mutations within this window are coalesced into one write; a burst that
+# keeps going is still flushed at least every EXCEL_MAX_DELAY seconds.
+EXCEL_DEBOUNCE = float(os.environ.get('EXCEL_DEBOUNCE_SECONDS', 2))
+EXCEL_MAX_DELAY = float(os.environ.get('EXCEL_MAX_DELAY_SECONDS', 10))
+
+COLUMNS = [
+    "Name", "Platform", "Rating", "Rank", "Global/Last Contest Rank",
+    "Country Rank", "Problems Solved", "Total Contests", "Date",
+]
+
 def update_excel(users):
     """
-    Appends or updates user data in the Excel file.
+    Rewrites the Excel file with the given users.
+    Rows are streamed into a write-only workbook saved to a temp file, which is
+    then renamed over the old file so readers never see a partial workbook.
     """
-    data = []
-    for user in users:
-        data.append({
-            "Name": user.name,
-            "Platform": user.platform,
-            "Rating": user.rating,
-            "Rank": user.rank,
-            "Global/Last Contest Rank": user.global_rank,
-            "Country Rank": user.country_rank,
-            "Problems Solved": user.recent_problems,
-            "Total Contests": user.total_contests,
-            "Date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        })
-    
-    df_new = pd.DataFrame(data)
-    
+    # openpyxl takes longer to import than the rest of the app; load it on first export
+    from openpyxl import Workbook
+    path = get_excel_path()
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    tmp_path = None
     try:
-        df_new.to_excel(EXCEL_FILE, index=False)
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet()
+        ws.append(COLUMNS)
+        for user in users:
+            ws.append([
+                user.name, user.platform, user.rating, user.rank, user.global_rank,
+                user.country_rank, user.recent_problems, user.total_contests, now,
+            ])
+        fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=os.path.dirname(path))
+        os.close(fd)
+        wb.save(tmp_path)
+        os.replace(tmp_path, path)
+        tmp_path = None
     except Exception as e:
         print(f"Error updating Excel: {e}")
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+_lock = threading.Condition()
+_pending_job = None
+_first_request = None
+_last_request = None
+_writer = None
+
+def schedule_excel_update(job):
+    """
+    Queues `job` (a callable that writes the export, e.g. by calling
+    update_excel) on the background writer and returns immediately.
+    Calls made during the debounce window replace the queued job, so a burst
+    of mutations results in a single write.
+    """
+    global _pending_job, _first_request, _last_request, _writer
+    with _lock:
+        now = time.monotonic()
+        if _pending_job is None:
+            _first_request = now
+        _pending_job = job
+        _last_request = now
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="excel-writer", daemon=True)
+            _writer.start()
+        _lock.notify()
+
+def _take_due_job():
+    """Blocks until a queued job is due, then dequeues and returns it."""
+    global _pending_job
+    with _lock:
+        while True:
+            if _pending_job is None:
+                _lock.wait()
+                continue
+            due = min(_last_request + EXCEL_DEBOUNCE, _first_request + EXCEL_MAX_DELAY)
+            remaining = due - time.monotonic()
+            if remaining <= 0:
+                job, _pending_job = _pending_job, None
+                return job
+            _lock.wait(remaining)
+
+def _writer_loop():
+    while True:
+        job = _take_due_job()
+        try:
+            job()
+        except Exception as e:
+            print(f"Error in background Excel export: {e}")
+
+@atexit.register
+def flush_excel_update():
+    """Runs a still-queued export synchronously (used at shutdown)."""
+    global _pending_job
+    with _lock:
+        job, _pending_job = _pending_job, None
+    if job is not None:
+        job()
 
 def get_excel_path():
     return os.path.abspath(EXCEL_FILE)
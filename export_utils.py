@@ -0,0 +1,114 @@
+import io
+import csv
+import json
+from datetime import datetime
+
+# Rows fetched from the cursor (and encoded) per chunk; memory use is bounded
+# by this, not by the size of the roster
+EXPORT_CHUNK_ROWS = 1000
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+class ExportUnavailable(Exception):
+    """Raised when an export format needs an optional dependency that is not installed."""
+
+def _plain(value):
+    return value.isoformat(sep=' ') if isinstance(value, datetime) else value
+
+def _chunks(rows):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def iter_csv(columns, rows):
+    """Yields CSV text (header first) in chunks of EXPORT_CHUNK_ROWS rows."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    yield buf.getvalue()
+    for chunk in _chunks(rows):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows([_plain(v) for v in row] for row in chunk)
+        yield buf.getvalue()
+
+def iter_ndjson(columns, rows):
+    """Yields one JSON object per line, EXPORT_CHUNK_ROWS rows per chunk."""
+    for chunk in _chunks(rows):
+        yield "".join(json.dumps(dict(zip(columns, map(_plain, row)))) + "\n" for row in chunk)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only stream that hands out what was written since the last take()."""
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def take(self):
+        data, self.parts = b"".join(self.parts), []
+        return data
+
+def _pyarrow():
+    """Returns the (pyarrow, pyarrow.parquet) modules, or raises ExportUnavailable."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Parquet export needs pyarrow (pip install pyarrow)")
+    return pa, pq
+
+def _arrow_schema(pa, columns):
+    types = {int: pa.int64(), float: pa.float64(), str: pa.string(), datetime: pa.timestamp('us')}
+    return pa.schema([(c.key, types.get(c.type.python_type, pa.string())) for c in columns])
+
+def iter_parquet(columns, rows, modules):
+    """
+    Yields a Parquet file with one row group per EXPORT_CHUNK_ROWS rows.
+    Each row group is written out as soon as it is full, so only one chunk is
+    held in memory; the footer follows the last one.
+    """
+    pa, pq = modules
+    schema = _arrow_schema(pa, columns)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(rows):
+        writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, row)) for row in chunk], schema=schema))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+def stream_export(fmt, columns, rows):
+    """
+    Returns a generator encoding `rows` (an iterable of tuples ordered like
+    `columns`, which are model attributes such as User.rating) as `fmt`.
+    Raises ExportUnavailable before anything is streamed if the format's
+    dependency is missing.
+    """
+    names = [c.key for c in columns]
+    if fmt == "csv":
+        return iter_csv(names, rows)
+    if fmt == "ndjson":
+        return iter_ndjson(names, rows)
+    if fmt == "parquet":
+        return iter_parquet(columns, rows, _pyarrow())
+    raise ValueError(f"Unknown export format {fmt}")
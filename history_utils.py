@@ -0,0 +1,33 @@
+import time
+from models import db, RatingHistory
+
+def window_start(days):
+    """Unix timestamp `days` days ago."""
+    return int(time.time()) - int(days * 86400)
+
+def rating_history(days, user_id=None):
+    """
+    Returns {user_id: [(ts, rating), ...]} for snapshots in the last `days` days,
+    oldest first. Served by the (user_id, ts) index for one user and the ts
+    index for everyone; only the needed columns are loaded.
+    """
+    since = window_start(days)
+    query = db.session.query(RatingHistory.user_id, RatingHistory.ts, RatingHistory.rating)
+    if user_id is not None:
+        query = query.filter(RatingHistory.user_id == user_id)
+    query = query.filter(RatingHistory.ts >= since).order_by(RatingHistory.user_id, RatingHistory.ts)
+
+    history = {}
+    for uid, ts, rating in query.yield_per(5000):
+        history.setdefault(uid, []).append((ts, rating))
+    return history
+
+def latest_before(user_id, ts):
+    """Returns the last snapshot of a user taken before `ts`, or None."""
+    return (RatingHistory.query
+            .filter(RatingHistory.user_id == user_id, RatingHistory.ts < ts)
+            .order_by(RatingHistory.ts.desc())
+            .first())
+
+def delete_history(user_id):
+    RatingHistory.query.filter_by(user_id=user_id).delete(synchronize_session=False)
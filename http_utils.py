@@ -0,0 +1,231 @@
+import os
+import time
+import threading
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cache_utils import cached_request, endpoint_for
+from metrics_utils import inc, observe
+
+# Upstream hosts used by api_utils, mapped to the platform they belong to
+HOST_PLATFORMS = {
+    "codeforces.com": "codeforces",
+    "leetcode.com": "leetcode",
+    "codechef-api.vercel.app": "codechef",
+    "www.codechef.com": "codechef",
+    "atcoder.jp": "atcoder",
+    "www.hackerrank.com": "hackerrank",
+}
+
+# Connections kept alive per host. Override per platform with e.g. LEETCODE_POOL_SIZE.
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+POOL_SIZES = {
+    p: int(os.environ.get(f'{p.upper()}_POOL_SIZE', HTTP_POOL_SIZE))
+    for p in set(HOST_PLATFORMS.values())
+}
+
+# Retries on 429/5xx with exponential backoff (0.5s, 1s, 2s, ...) plus jitter.
+# Retry-After from the upstream is honoured when present.
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', 0.5))
+
+# Send all upstream traffic to this base URL instead, e.g. the benchmark replay
+# server: https://codeforces.com/api/... -> {UPSTREAM_BASE_URL}/codeforces.com/api/...
+# Sessions, breakers and the cache stay keyed by the original host/URL.
+UPSTREAM_BASE_URL = os.environ.get('UPSTREAM_BASE_URL', '').rstrip('/')
+
+def upstream_url(url):
+    if not UPSTREAM_BASE_URL:
+        return url
+    parts = urlsplit(url)
+    return f"{UPSTREAM_BASE_URL}/{parts.hostname}{parts.path}" + (f"?{parts.query}" if parts.query else "")
+
+# Circuit breaker: after this many consecutive failures (errors, timeouts,
+# 429/5xx) a host is skipped for CIRCUIT_RESET_SECONDS, then probed again.
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get('CIRCUIT_FAILURE_THRESHOLD', 5))
+CIRCUIT_RESET_SECONDS = float(os.environ.get('CIRCUIT_RESET_SECONDS', 60))
+
+_sessions = {}
+_breakers = {}
+_sessions_lock = threading.Lock()
+
+class CircuitOpenError(requests.RequestException):
+    """Raised instead of sending a request while the host's circuit is open."""
+
+class CircuitBreaker:
+    """
+    Per-host breaker. closed: requests flow. open: requests fail fast until
+    CIRCUIT_RESET_SECONDS have passed. half_open: a single probe request is
+    let through; its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, host):
+        self.host = host
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "closed":
+                return True
+            if self.state == "open" and time.monotonic() - self.opened_at >= CIRCUIT_RESET_SECONDS:
+                print(f"Circuit half-open for {self.host}, sending probe")
+                self.state = "half_open"
+            if self.state == "half_open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            if self.state != "closed":
+                print(f"Circuit closed for {self.host}")
+            self.state = "closed"
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == "half_open" or self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+                if self.state != "open":
+                    print(f"Circuit open for {self.host} after {self.failures} consecutive failures")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    def snapshot(self):
+        with self.lock:
+            retry_in = None
+            if self.state == "open":
+                retry_in = max(0, round(CIRCUIT_RESET_SECONDS - (time.monotonic() - self.opened_at)))
+            return {"host": self.host, "state": self.state, "failures": self.failures, "retry_in": retry_in}
+
+class _GuardedSession:
+    """Session wrapper that consults and updates the host's circuit breaker."""
+
+    def __init__(self, session, breaker):
+        self.session = session
+        self.breaker = breaker
+
+    def request(self, method, url, **kwargs):
+        if not self.breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {self.breaker.host}")
+        try:
+            response = self.session.request(method, upstream_url(url), **kwargs)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+def _build_session(host):
+    pool_size = POOL_SIZES.get(HOST_PLATFORMS.get(host), HTTP_POOL_SIZE)
+    retry = Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=0,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        backoff_jitter=HTTP_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=None,  # the LeetCode GraphQL POSTs are read-only queries
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def get_session(url):
+    """
+    Returns the shared keep-alive session for the host of `url`.
+    Sessions are created once per host and are safe to use from worker threads.
+    """
+    host = urlsplit(url).hostname or ""
+    session = _sessions.get(host)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _build_session(host)
+    return session
+
+def get_breaker(url):
+    host = urlsplit(url).hostname or ""
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _sessions_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(host))
+    return breaker
+
+def circuit_states():
+    """Snapshots of every breaker this process has created."""
+    return [breaker.snapshot() for breaker in list(_breakers.values())]
+
+def open_circuits():
+    """Hosts whose circuit is currently open or half-open."""
+    return sorted(s["host"] for s in circuit_states() if s["state"] != "closed")
+
+# 429s and timeouts seen per platform since the scheduler last looked
+_throttle_events = {}
+_throttle_lock = threading.Lock()
+
+def _record_throttle(url):
+    platform = HOST_PLATFORMS.get(urlsplit(url).hostname or "")
+    if platform:
+        with _throttle_lock:
+            _throttle_events[platform] = _throttle_events.get(platform, 0) + 1
+
+def pop_throttle_events():
+    """Returns {platform: count} of 429s/timeouts since the last call and resets it."""
+    global _throttle_events
+    with _throttle_lock:
+        events, _throttle_events = _throttle_events, {}
+    return events
+
+def _request(method, url, **kwargs):
+    labels = {
+        "platform": HOST_PLATFORMS.get(urlsplit(url).hostname, "other"),
+        "endpoint": endpoint_for(url)[0] or "other",
+    }
+    start = time.perf_counter()
+    try:
+        # Fresh cache hits are served even while the circuit is open
+        session = _GuardedSession(get_session(url), get_breaker(url))
+        response = cached_request(session, method, url, **kwargs)
+    except CircuitOpenError:
+        inc("contest_upstream_requests_total", outcome="circuit_open", **labels)
+        raise
+    except Exception as e:
+        if isinstance(e, (requests.Timeout, requests.ConnectionError)):
+            _record_throttle(url)
+        outcome = "timeout" if isinstance(e, requests.Timeout) else "failure"
+        observe("contest_upstream_request_seconds", time.perf_counter() - start, **labels)
+        inc("contest_upstream_requests_total", outcome=outcome, **labels)
+        raise
+    if response.status_code == 429:
+        _record_throttle(url)
+    if getattr(response, 'from_cache', False):
+        # Served (or revalidated) from the response cache; kept out of the latency histogram
+        inc("contest_upstream_requests_total", outcome="cached", **labels)
+    else:
+        observe("contest_upstream_request_seconds", time.perf_counter() - start, **labels)
+        outcome = "success" if response.status_code < 400 else "failure"
+        inc("contest_upstream_requests_total", outcome=outcome, **labels)
+    return response
+
+def http_get(url, **kwargs):
+    return _request('GET', url, **kwargs)
+
+def http_post(url, **kwargs):
+    return _request('POST', url, **kwargs)
@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from api_utils import extract_handle_from_url
+
+# Largest roster accepted in one upload
+IMPORT_MAX_ROWS = 2000
+
+class RosterError(ValueError):
+    """Raised when an uploaded roster cannot be parsed."""
+
+def parse_roster(filename, content):
+    """
+    Parses an uploaded roster (CSV with a name,platform,profile_url header, or a
+    JSON list of objects with those keys) into a list of dicts.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8-sig')
+    if filename.lower().endswith('.json') or content.lstrip().startswith('['):
+        try:
+            rows = json.loads(content)
+        except json.JSONDecodeError as e:
+            raise RosterError(f"Invalid JSON: {e}")
+        if not isinstance(rows, list) or not all(isinstance(r, dict) for r in rows):
+            raise RosterError("JSON roster must be a list of objects")
+    else:
+        reader = csv.DictReader(io.StringIO(content))
+        missing = {"name", "platform", "profile_url"} - set(f.strip().lower() for f in reader.fieldnames or [])
+        if missing:
+            raise RosterError(f"CSV is missing columns: {', '.join(sorted(missing))}")
+        rows = [{(k or "").strip().lower(): (v or "").strip() for k, v in r.items()} for r in reader]
+
+    if len(rows) > IMPORT_MAX_ROWS:
+        raise RosterError(f"Roster has {len(rows)} rows; the limit is {IMPORT_MAX_ROWS}")
+    return [
+        {
+            "name": str(r.get("name") or "").strip(),
+            "platform": str(r.get("platform") or "").strip(),
+            "profile_url": str(r.get("profile_url") or "").strip(),
+        }
+        for r in rows
+    ]
+
+def normalize_roster(rows, platforms):
+    """
+    Validates rows and resolves handles. Each row gets a "row" number, a
+    canonical "platform" and a "handle"; rows that fail validation or repeat an
+    earlier row's (platform, handle) or profile_url get a "result" and
+    "message" instead.
+    """
+    canonical = {p.lower(): p for p in platforms}
+    seen = set()
+    seen_urls = set()  # profile_url is unique across platforms
+    for i, row in enumerate(rows, start=1):
+        row["row"] = i
+        platform = canonical.get(row["platform"].lower())
+        if not row["name"] or not row["profile_url"] or not platform:
+            row.update(result="invalid", message="name, a known platform and profile_url are required")
+            continue
+        row["platform"] = platform
+        handle = extract_handle_from_url(row["profile_url"], platform)
+        if not handle:
+            row.update(result="invalid", message=f"Could not extract a {platform} handle")
+            continue
+        key = (platform, handle.lower())
+        if key in seen or row["profile_url"] in seen_urls:
+            row.update(result="duplicate", message="Repeated earlier in the upload")
+            continue
+        seen.add(key)
+        seen_urls.add(row["profile_url"])
+        row["handle"] = handle
+    return rows
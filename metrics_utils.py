@@ -0,0 +1,250 @@
+import os
+import time
+import json
+import atexit
+import threading
+from contextlib import contextmanager
+
+# Each process (gunicorn worker) writes its own metrics-<pid>.json here, and
+# /metrics merges all of them, so the endpoint shows totals for the whole app.
+# Files of exited processes are folded into metrics-archive.json.
+if os.environ.get('METRICS_DIR'):
+    METRICS_DIR = os.environ['METRICS_DIR']
+elif os.environ.get('RENDER'):
+    METRICS_DIR = '/tmp/metrics'
+else:
+    METRICS_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), 'instance', 'metrics')
+
+# How often a process writes its metrics file when something changed
+METRICS_FLUSH_SECONDS = float(os.environ.get('METRICS_FLUSH_SECONDS', 5))
+
+# Histogram bucket upper bounds, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# name -> (type, help)
+METRICS = {
+    "contest_upstream_request_seconds": (
+        "histogram", "Upstream HTTP request latency including retries, by platform and endpoint"),
+    "contest_upstream_requests_total": (
+        "counter", "Upstream HTTP requests by platform, endpoint and outcome"),
+    "contest_fetch_job_seconds": (
+        "histogram", "Duration of one refresh fetch job (one user, or one batch), by platform"),
+    "contest_fetch_results_total": (
+        "counter", "Per-user fetch results by platform and outcome"),
+    "contest_stage_seconds": (
+        "histogram", "Duration of refresh stages: fetch, db_commit, excel_export, template_render"),
+}
+
+_lock = threading.Lock()
+_values = {}  # (name, sorted label items) -> float for counters, dict for histograms
+_dirty = False
+_flusher = None
+
+ARCHIVE_NAME = "metrics-archive.json"
+
+def _path(pid):
+    return os.path.join(METRICS_DIR, f"metrics-{pid}.json")
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # exists but belongs to someone else
+    return True
+
+def _key(name, labels):
+    if name not in METRICS:
+        raise KeyError(f"Unknown metric {name}")
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+def _changed():
+    global _dirty, _flusher
+    _dirty = True
+    if _flusher is None or not _flusher.is_alive():
+        _flusher = threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True)
+        _flusher.start()
+
+def inc(name, amount=1, **labels):
+    """Adds `amount` to a counter."""
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+        _changed()
+
+def observe(name, seconds, **labels):
+    """Records one observation in a histogram."""
+    key = _key(name, labels)
+    with _lock:
+        hist = _values.get(key)
+        if hist is None:
+            hist = _values[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                hist["buckets"][i] += 1
+                break
+        hist["sum"] += seconds
+        hist["count"] += 1
+        _changed()
+
+@contextmanager
+def timer(name, **labels):
+    """Observes the duration of the with-block in a histogram, even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start, **labels)
+
+def _serialize(values):
+    return [[name, list(labels), value] for (name, labels), value in values.items()]
+
+def _deserialize(rows):
+    return {(name, tuple(tuple(l) for l in labels)): value for name, labels, value in rows}
+
+def flush_metrics():
+    """Writes this process's metrics to its file (atomically)."""
+    global _dirty
+    with _lock:
+        rows = _serialize(_values)
+        _dirty = False
+    try:
+        os.makedirs(METRICS_DIR, exist_ok=True)
+        tmp_path = _path(f"{os.getpid()}.tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(rows, f)
+        os.replace(tmp_path, _path(os.getpid()))
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        if _dirty:
+            flush_metrics()
+
+@atexit.register
+def _flush_at_exit():
+    if _dirty:
+        flush_metrics()
+
+def _merge(total, values):
+    for key, value in values.items():
+        if isinstance(value, dict):
+            hist = total.setdefault(key, {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0})
+            hist["buckets"] = [a + b for a, b in zip(hist["buckets"], value["buckets"])]
+            hist["sum"] += value["sum"]
+            hist["count"] += value["count"]
+        else:
+            total[key] = total.get(key, 0) + value
+
+def _read(path):
+    with open(path) as f:
+        return _deserialize(json.load(f))
+
+@contextmanager
+def _archive_lock():
+    try:
+        import fcntl
+    except ImportError:
+        yield  # no flock (Windows): single-process dev server
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    with open(os.path.join(METRICS_DIR, "archive.lock"), 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
+
+def archive_metrics(pids):
+    """
+    Folds the files of exited processes into the archive and deletes them, so
+    their counters are kept without one file per pid piling up, and a new
+    process that reuses a pid starts from zero.
+    """
+    if not pids:
+        return
+    archive_path = os.path.join(METRICS_DIR, ARCHIVE_NAME)
+    try:
+        with _archive_lock():
+            paths = [p for p in map(_path, pids) if os.path.exists(p)]
+            if not paths:
+                return  # another process archived them first
+            try:
+                total = _read(archive_path)
+            except FileNotFoundError:
+                total = {}
+            for path in paths:
+                try:
+                    _merge(total, _read(path))
+                except ValueError as e:
+                    print(f"Dropping unreadable metrics file {path}: {e}")
+            tmp_path = archive_path + ".tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(_serialize(total), f)
+            os.replace(tmp_path, archive_path)
+            for path in paths:
+                os.remove(path)
+    except (OSError, ValueError) as e:
+        print(f"Error archiving metrics: {e}")
+
+def collect():
+    """
+    Returns the metrics of every process: this one's live values, the last
+    flushed file of each other live worker and the archive of exited ones,
+    so counters never go backwards while the app is up.
+    """
+    own = os.path.basename(_path(os.getpid()))
+    total = {}
+    try:
+        names = os.listdir(METRICS_DIR)
+    except OSError:
+        names = []
+    dead = [int(name[8:-5]) for name in names
+            if name != own and name[8:-5].isdigit() and not _pid_alive(int(name[8:-5]))]
+    if dead:
+        archive_metrics(dead)
+        names = os.listdir(METRICS_DIR)
+    for name in names:
+        if name == own or not name.startswith("metrics-") or not name.endswith(".json"):
+            continue
+        try:
+            _merge(total, _read(os.path.join(METRICS_DIR, name)))
+        except FileNotFoundError:
+            pass  # archived by another process meanwhile
+        except (OSError, ValueError) as e:
+            print(f"Skipping unreadable metrics file {name}: {e}")
+    with _lock:
+        _merge(total, {key: (dict(v, buckets=list(v["buckets"])) if isinstance(v, dict) else v)
+                       for key, v in _values.items()})
+    return total
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+def render_metrics():
+    """Renders all metrics in the Prometheus text exposition format."""
+    values = collect()
+    lines = []
+    for name, (kind, help_text) in METRICS.items():
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for (metric, labels), value in sorted(values.items()):
+            if metric != name:
+                continue
+            if kind == "counter":
+                lines.append(f"{name}{_format_labels(labels)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(BUCKETS, value["buckets"]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {value['count']}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {value['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {value['count']}")
+    return "\n".join(lines) + "\n"
+
+# A file under this pid was left by an exited process that had the same pid
+archive_metrics([os.getpid()])
@@ -1,4 +1,8 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.schema import CreateColumn
+import time
+import zlib
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -15,6 +19,14 @@ class User(db.Model):
     recent_problems = db.Column(db.Integer, default=0)
     total_contests = db.Column(db.Integer, default=0)
     last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    # "pending" until the initial fetch finishes, then "ready" (or "failed")
+    status = db.Column(db.String(20), nullable=False, default="ready", server_default="ready")
+    # Last refresh attempt, successful or not; the scheduler refreshes the oldest first
+    last_attempt = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_user_platform_last_attempt', 'platform', 'last_attempt'),
+    )
 
     def to_dict(self):
         return {
@@ -28,5 +40,183 @@ class User(db.Model):
             "country_rank": self.country_rank,
             "recent_problems": self.recent_problems,
             "total_contests": self.total_contests,
-            "last_updated": self.last_updated.strftime("%Y-%m-%d %H:%M:%S")
+            "last_updated": self.last_updated.strftime("%Y-%m-%d %H:%M:%S"),
+            "status": self.status
         }
+
+class DataVersion(db.Model):
+    """Single-row counter bumped by every write to User; shared by all workers."""
+    __tablename__ = 'data_version'
+    id = db.Column(db.Integer, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+def get_data_version():
+    return db.session.execute(db.select(DataVersion.version).where(DataVersion.id == 1)).scalar() or 0
+
+def bump_data_version():
+    """
+    Increments the data version inside the current transaction, so the bump
+    commits (or rolls back) together with the write it describes.
+    """
+    db.session.execute(db.update(DataVersion).where(DataVersion.id == 1)
+                       .values(version=DataVersion.version + 1))
+
+# Indexes no longer defined above, dropped from existing DBs on upgrade
+# (the leaderboard now pages through user_ranking, not by User.rating)
+RETIRED_INDEXES = ('ix_user_rating_id', 'ix_user_platform_rating_id')
+
+def upgrade_schema(conn):
+    """
+    Creates tables plus any columns and indexes added since an existing DB was
+    created (create_all skips tables that already exist), and drops retired
+    indexes. Runs on `conn` inside the caller's transaction.
+    """
+    db.metadata.create_all(conn)
+    inspector = db.inspect(conn)
+    for table in db.metadata.sorted_tables:
+        existing = {c['name'] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN {ddl}')
+    for name in RETIRED_INDEXES:
+        conn.exec_driver_sql(f'DROP INDEX IF EXISTS "{name}"')
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+    conn.execute(sqlite_insert(DataVersion).values(id=1, version=0).on_conflict_do_nothing())
+
+def schema_fingerprint():
+    """A number identifying the tables, columns and indexes defined in this module."""
+    parts = [
+        f"{t.name}:{','.join(c.name for c in t.columns)}:{','.join(sorted(i.name for i in t.indexes))}"
+        for t in db.metadata.sorted_tables
+    ]
+    return zlib.crc32("|".join(parts).encode('utf-8')) & 0x7fffffff
+
+def ensure_schema():
+    """
+    Runs upgrade_schema unless the DB already records the current schema in
+    PRAGMA user_version, which makes startup on an up-to-date DB one query.
+    Returns True if the schema was upgraded.
+    """
+    fingerprint = schema_fingerprint()
+    if db.session.execute(db.text("PRAGMA user_version")).scalar() == fingerprint:
+        return False
+    with db.engine.connect() as conn:
+        # Several gunicorn workers may start on a fresh DB at once. Taking the
+        # write lock up front makes them upgrade one after another, and each
+        # re-checks the version once it has the lock.
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        if conn.exec_driver_sql("PRAGMA user_version").scalar() == fingerprint:
+            conn.rollback()
+            return False
+        upgrade_schema(conn)
+        conn.exec_driver_sql(f"PRAGMA user_version = {fingerprint}")
+        conn.commit()
+    return True
+
+class CodeforcesSync(db.Model):
+    """Solved-problem state per Codeforces handle, so refreshes only fetch new submissions."""
+    handle = db.Column(db.String(100), primary_key=True)  # lowercased
+    last_submission_id = db.Column(db.Integer, default=0)
+    solved = db.Column(db.Text, default="")  # comma-separated problem ids, e.g. "1A,1500C"
+
+    def to_state(self):
+        return {
+            "handle": self.handle,
+            "last_submission_id": self.last_submission_id or 0,
+            "solved": set(filter(None, (self.solved or "").split(","))),
+        }
+
+class RatingHistory(db.Model):
+    """
+    Append-only snapshots of a user's stats, written only when a value changed.
+    Kept compact: integer columns only, timestamps as unix seconds.
+    """
+    __tablename__ = 'rating_history'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    ts = db.Column(db.Integer, nullable=False, index=True)
+    rating = db.Column(db.Integer, default=0)
+    global_rank = db.Column(db.Integer, default=0)
+    recent_problems = db.Column(db.Integer, default=0)
+    total_contests = db.Column(db.Integer, default=0)
+
+    user = db.relationship('User')
+
+    __table_args__ = (
+        db.Index('ix_rating_history_user_ts', 'user_id', 'ts'),
+    )
+
+    # User fields that are tracked; a change in any of them triggers a snapshot
+    TRACKED_FIELDS = ('rating', 'global_rank', 'recent_problems', 'total_contests')
+
+    @classmethod
+    def snapshot(cls, user):
+        return cls(
+            user=user,
+            ts=int(time.time()),
+            **{field: getattr(user, field) or 0 for field in cls.TRACKED_FIELDS}
+        )
+
+class ChangeEvent(db.Model):
+    """
+    Leaderboard deltas for the /events feed, written in the same transaction
+    as the change they describe. Every worker polls this table, so viewers
+    see writes made by any process.
+    """
+    __tablename__ = 'change_event'
+    id = db.Column(db.Integer, primary_key=True)
+    ts = db.Column(db.Integer, nullable=False, index=True)
+    kind = db.Column(db.String(20), nullable=False)  # update, touch, insert, delete
+    data = db.Column(db.Text, nullable=False)  # JSON
+
+    # AUTOINCREMENT: ids are never reused after old events are pruned, so a
+    # client's Last-Event-ID always refers to the same event
+    __table_args__ = {'sqlite_autoincrement': True}
+
+class UserRanking(db.Model):
+    """
+    Materialized leaderboard positions of ready users, kept in step with User
+    by ranking_utils. Rank 1 is the best; ranks within a scope have no gaps,
+    so the largest rank is the scope's size.
+    """
+    __tablename__ = 'user_ranking'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    platform = db.Column(db.String(50), nullable=False)
+    rating = db.Column(db.Integer, nullable=False, default=0)
+    # Rating mapped onto a 0-100 scale shared by all platforms
+    score = db.Column(db.Float, nullable=False, default=0)
+    platform_rank = db.Column(db.Integer, nullable=False)  # by (rating, user_id) desc
+    overall_rank = db.Column(db.Integer, nullable=False)  # by (score, user_id) desc
+
+    __table_args__ = (
+        # Position lookups when a rating moves
+        db.Index('ix_user_ranking_platform_rating', 'platform', 'rating', 'user_id'),
+        db.Index('ix_user_ranking_score', 'score', 'user_id'),
+        # Pages, rank shifts and scope sizes
+        db.Index('ix_user_ranking_platform_rank', 'platform', 'platform_rank'),
+        db.Index('ix_user_ranking_overall_rank', 'overall_rank'),
+    )
+
+class RefreshJob(db.Model):
+    """
+    One user's refresh within a refresh cycle of their platform. Processes
+    lease jobs for a limited time; a job whose holder died is handed out
+    again once its lease expires.
+    """
+    __tablename__ = 'refresh_job'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)
+    platform = db.Column(db.String(50), nullable=False)
+    cycle = db.Column(db.Integer, nullable=False)
+    state = db.Column(db.String(10), nullable=False, default="queued")  # queued, leased, done, failed
+    owner = db.Column(db.String(100))  # worker holding the lease
+    lease_expires = db.Column(db.Integer)  # unix seconds
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created = db.Column(db.Integer, nullable=False)  # unix seconds
+
+    __table_args__ = (
+        db.Index('ix_refresh_job_platform_state', 'platform', 'state', 'id'),
+    )
@@ -0,0 +1,95 @@
+import os
+import time
+import socket
+from sqlalchemy import select, update, delete, insert, func, and_, or_, exists, literal
+from models import db, User, RefreshJob
+
+# How long a claimed job belongs to its worker; must exceed one batch's
+# fetch-and-write time, or a slow batch is fetched twice
+REFRESH_LEASE_SECONDS = int(os.environ.get('REFRESH_LEASE_SECONDS', 300))
+# Leases a job may expire before it is given up on (its worker keeps dying on it)
+REFRESH_MAX_ATTEMPTS = int(os.environ.get('REFRESH_MAX_ATTEMPTS', 3))
+# Minimum seconds between the starts of two cycles of a platform; 0 starts
+# the next cycle as soon as the last one is done
+REFRESH_CYCLE_SECONDS = int(os.environ.get('REFRESH_CYCLE_SECONDS', 0))
+
+OPEN_STATES = ('queued', 'leased')
+
+def worker_id():
+    """Lease owner name of this process."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def _enqueue_cycle(platform, now):
+    """
+    Queues every ready or pending user of `platform`, stalest first, unless
+    the platform's current cycle is still open or started too recently.
+    A single INSERT ... SELECT, so concurrent workers cannot queue a cycle twice.
+    """
+    jobs = select(RefreshJob.id).where(RefreshJob.platform == platform)
+    cycle = select(func.coalesce(func.max(RefreshJob.cycle), 0) + 1) \
+        .where(RefreshJob.platform == platform).scalar_subquery()
+    users = select(User.id, literal(platform), cycle, literal('queued'), literal(0), literal(now)).where(
+        User.platform == platform,
+        User.status.in_(('ready', 'pending')),
+        ~exists(jobs.where(RefreshJob.state.in_(OPEN_STATES))),
+        ~exists(jobs.where(RefreshJob.created > now - REFRESH_CYCLE_SECONDS)),
+    ).order_by(User.last_attempt.asc())
+    queued = db.session.execute(insert(RefreshJob).from_select(
+        ['user_id', 'platform', 'cycle', 'state', 'attempts', 'created'], users
+    )).rowcount
+    if queued:
+        # Jobs of earlier cycles are all finished by now
+        db.session.execute(delete(RefreshJob).where(
+            RefreshJob.platform == platform, RefreshJob.state.notin_(OPEN_STATES)
+        ))
+    return queued
+
+def claim_jobs(owner, platform, limit):
+    """
+    Leases up to `limit` jobs of `platform` to `owner`, queueing a new cycle
+    first if the last one is done. Expired leases are claimable again.
+    The lease is one UPDATE ... RETURNING, so no two workers get the same
+    job. Commits. Returns [(job_id, user_id)].
+    """
+    if limit <= 0:
+        return []
+    now = int(time.time())
+    _enqueue_cycle(platform, now)
+    claimable = and_(RefreshJob.platform == platform, or_(
+        RefreshJob.state == 'queued',
+        and_(RefreshJob.state == 'leased', RefreshJob.lease_expires < now),
+    ))
+    db.session.execute(update(RefreshJob).where(claimable, RefreshJob.attempts >= REFRESH_MAX_ATTEMPTS)
+                       .values(state='failed', owner=None))
+    ids = select(RefreshJob.id).where(claimable).order_by(RefreshJob.id).limit(limit).scalar_subquery()
+    claimed = db.session.execute(
+        update(RefreshJob).where(RefreshJob.id.in_(ids))
+        .values(state='leased', owner=owner, lease_expires=now + REFRESH_LEASE_SECONDS,
+                attempts=RefreshJob.attempts + 1)
+        .returning(RefreshJob.id, RefreshJob.user_id)
+    ).all()
+    db.session.commit()
+    return [tuple(row) for row in claimed]
+
+def complete_jobs(owner, job_ids):
+    """
+    Marks jobs done if `owner` still holds their lease. Returns how many were;
+    a shortfall means a lease expired and another worker took the job over.
+    """
+    if not job_ids:
+        return 0
+    return db.session.execute(
+        update(RefreshJob)
+        .where(RefreshJob.id.in_(job_ids), RefreshJob.owner == owner, RefreshJob.state == 'leased')
+        .values(state='done', lease_expires=None)
+    ).rowcount
+
+def queue_stats():
+    """Returns {platform: {state: count}} for the current cycles."""
+    stats = {}
+    rows = db.session.execute(
+        select(RefreshJob.platform, RefreshJob.state, func.count()).group_by(RefreshJob.platform, RefreshJob.state)
+    )
+    for platform, state, count in rows:
+        stats.setdefault(platform, {})[state] = count
+    return stats
@@ -0,0 +1,161 @@
+import os
+from bisect import bisect_right
+from sqlalchemy import select, update, delete, insert, tuple_, true
+from models import db, User, UserRanking
+
+# Rating -> score anchors per platform, placed at comparable tiers (e.g.
+# Codeforces Master, CodeChef 6 star, AtCoder orange and LeetCode Guardian
+# all score 65-70); scores are interpolated linearly between anchors
+PLATFORM_SCORE_ANCHORS = {
+    "Codeforces": ((0, 0), (1200, 20), (1400, 30), (1600, 40), (1900, 55), (2100, 65), (2400, 80), (3000, 95), (3800, 100)),
+    "CodeChef": ((0, 0), (1400, 20), (1600, 30), (1800, 40), (2000, 55), (2200, 65), (2500, 80), (3000, 95), (3600, 100)),
+    "AtCoder": ((0, 0), (400, 10), (800, 20), (1200, 30), (1600, 40), (2000, 55), (2400, 70), (2800, 85), (3600, 100)),
+    "LeetCode": ((0, 0), (1500, 20), (1850, 40), (2200, 65), (2600, 80), (3000, 95), (3500, 100)),
+}
+DEFAULT_SCORE_ANCHORS = ((0, 0), (3000, 100))
+
+# A batch moving more than this share of ranked users is applied as one
+# rebuild; shifting ranks user by user would touch more rows
+RANKING_REBUILD_FRACTION = float(os.environ.get('RANKING_REBUILD_FRACTION', 0.2))
+
+PLATFORM_ORDER = (UserRanking.rating, UserRanking.user_id)
+OVERALL_ORDER = (UserRanking.score, UserRanking.user_id)
+
+def platform_score(platform, rating):
+    """Maps a platform rating onto the shared 0-100 scale."""
+    anchors = PLATFORM_SCORE_ANCHORS.get(platform, DEFAULT_SCORE_ANCHORS)
+    rating = rating or 0
+    i = bisect_right([r for r, _ in anchors], rating)
+    if i == 0:
+        return float(anchors[0][1])
+    if i == len(anchors):
+        return float(anchors[-1][1])
+    (r0, s0), (r1, s1) = anchors[i - 1], anchors[i]
+    return round(s0 + (s1 - s0) * (rating - r0) / (r1 - r0), 3)
+
+def _move(rank_column, order, scope, user_id, old_rank, new_key):
+    """
+    Moves one user within a scope from `old_rank` (None when entering) to the
+    position of `new_key` (None when leaving), shifting only the ranks in
+    between by one. Returns the new rank.
+    """
+    new_rank = None
+    if new_key is not None:
+        # Rank of the closest user above the new key, found with one index seek
+        above = db.session.execute(
+            select(rank_column).where(scope, tuple_(*order) > new_key, UserRanking.user_id != user_id)
+            .order_by(*order).limit(1)
+        ).scalar() or 0
+        if old_rank is not None and above > old_rank:
+            above -= 1  # that user moves up once this one leaves its old rank
+        new_rank = above + 1
+
+    others = (scope, UserRanking.user_id != user_id)
+    if old_rank is None and new_rank is not None:
+        shift = (rank_column >= new_rank,), 1
+    elif new_rank is None and old_rank is not None:
+        shift = (rank_column > old_rank,), -1
+    elif new_rank is not None and new_rank < old_rank:
+        shift = (rank_column >= new_rank, rank_column < old_rank), 1
+    elif new_rank is not None and new_rank > old_rank:
+        shift = (rank_column > old_rank, rank_column <= new_rank), -1
+    else:
+        return new_rank
+    where, step = shift
+    db.session.execute(update(UserRanking).where(*others, *where).values({rank_column: rank_column + step}))
+    return new_rank
+
+def _stored(user_id):
+    return db.session.execute(
+        select(UserRanking.platform, UserRanking.rating, UserRanking.platform_rank, UserRanking.overall_rank)
+        .where(UserRanking.user_id == user_id)
+    ).first()
+
+def rank_user(user_id, platform, rating):
+    """Adds a ready user to the rankings or moves them after a rating change."""
+    rating = rating or 0
+    stored = _stored(user_id)
+    if stored is not None and stored.rating == rating:
+        return
+    score = platform_score(platform, rating)
+    platform_rank = _move(UserRanking.platform_rank, PLATFORM_ORDER, UserRanking.platform == platform,
+                          user_id, stored and stored.platform_rank, (rating, user_id))
+    overall_rank = _move(UserRanking.overall_rank, OVERALL_ORDER, true(),
+                         user_id, stored and stored.overall_rank, (score, user_id))
+    values = dict(rating=rating, score=score, platform_rank=platform_rank, overall_rank=overall_rank)
+    if stored is None:
+        db.session.execute(insert(UserRanking).values(user_id=user_id, platform=platform, **values))
+    else:
+        db.session.execute(update(UserRanking).where(UserRanking.user_id == user_id).values(**values))
+
+def unrank_user(user_id):
+    """Removes a user from the rankings, closing the gap they leave."""
+    stored = _stored(user_id)
+    if stored is None:
+        return
+    _move(UserRanking.platform_rank, PLATFORM_ORDER, UserRanking.platform == stored.platform,
+          user_id, stored.platform_rank, None)
+    _move(UserRanking.overall_rank, OVERALL_ORDER, true(), user_id, stored.overall_rank, None)
+    db.session.execute(delete(UserRanking).where(UserRanking.user_id == user_id))
+
+def rank_users(entries):
+    """
+    Applies (user_id, platform, rating) for several users, either one move at
+    a time or, for a large batch, as a rebuild from the User table (which must
+    already hold the new ratings).
+    """
+    if not entries:
+        return
+    if len(entries) > RANKING_REBUILD_FRACTION * scope_size():
+        rebuild_rankings()
+        return
+    for user_id, platform, rating in entries:
+        rank_user(user_id, platform, rating)
+
+def rebuild_rankings():
+    """Recomputes every ranking from the ready users."""
+    users = db.session.execute(
+        select(User.id, User.platform, User.rating).where(User.status == 'ready')
+    ).all()
+    rows = {
+        user_id: {"user_id": user_id, "platform": platform, "rating": rating or 0,
+                  "score": platform_score(platform, rating)}
+        for user_id, platform, rating in users
+    }
+    ordered = sorted(rows.values(), key=lambda r: (r["score"], r["user_id"]), reverse=True)
+    for rank, row in enumerate(ordered, 1):
+        row["overall_rank"] = rank
+    counts = {}
+    for row in sorted(rows.values(), key=lambda r: (r["rating"], r["user_id"]), reverse=True):
+        counts[row["platform"]] = row["platform_rank"] = counts.get(row["platform"], 0) + 1
+    db.session.execute(delete(UserRanking))
+    if rows:
+        db.session.execute(insert(UserRanking), list(rows.values()))
+
+def scope_size(platform=None):
+    """Number of ranked users overall or on one platform: the largest rank, read from its index."""
+    if platform:
+        query = select(UserRanking.platform_rank).where(UserRanking.platform == platform) \
+            .order_by(UserRanking.platform_rank.desc())
+    else:
+        query = select(UserRanking.overall_rank).order_by(UserRanking.overall_rank.desc())
+    return db.session.execute(query.limit(1)).scalar() or 0
+
+def user_standing(user_id):
+    """Ranks and platform percentile of one user, or None if they are not ranked."""
+    row = db.session.execute(select(UserRanking).where(UserRanking.user_id == user_id)).scalar()
+    if row is None:
+        return None
+    platform_size = scope_size(row.platform)
+    return {
+        "id": row.user_id,
+        "platform": row.platform,
+        "rating": row.rating,
+        "score": row.score,
+        "platform_rank": row.platform_rank,
+        "platform_size": platform_size,
+        # Share of the platform's users ranked at or below this one
+        "percentile": round(100 * (platform_size - row.platform_rank + 1) / platform_size, 2),
+        "overall_rank": row.overall_rank,
+        "overall_size": scope_size(),
+    }
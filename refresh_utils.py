@@ -0,0 +1,118 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from api_utils import (
+    fetch_user_data, extract_handle_from_url,
+    fetch_codeforces_data, fetch_codeforces_info_batch,
+    fetch_leetcode_batch, LEETCODE_BATCH_SIZE,
+)
+from metrics_utils import inc, timer
+
+# Max number of in-flight fetches per platform. Each platform gets its own
+# pool, so a slow site only delays its own users.
+PLATFORM_CONCURRENCY = {
+    "codeforces": int(os.environ.get('CODEFORCES_CONCURRENCY', 4)),
+    "leetcode": int(os.environ.get('LEETCODE_CONCURRENCY', 4)),
+    "codechef": int(os.environ.get('CODECHEF_CONCURRENCY', 4)),
+    "atcoder": int(os.environ.get('ATCODER_CONCURRENCY', 4)),
+    "hackerrank": int(os.environ.get('HACKERRANK_CONCURRENCY', 4)),
+}
+
+def _single(user_id, func, *args):
+    return {user_id: func(*args)}
+
+def _timed_job(platform, func, *args):
+    """Runs one fetch job, recording its duration and per-user outcomes."""
+    try:
+        with timer("contest_fetch_job_seconds", platform=platform):
+            results = func(*args)
+    except Exception:
+        inc("contest_fetch_results_total", platform=platform, outcome="error")
+        raise
+    for data in results.values():
+        inc("contest_fetch_results_total", platform=platform, outcome="success" if data else "failure")
+    return results
+
+def _codeforces_jobs(group, codeforces_sync):
+    """
+    Resolves every Codeforces user in `group` with batched user.info calls.
+    Returns jobs for the per-user rating/status fetches.
+    """
+    handles = {}
+    for user_id, profile_url, platform in group:
+        handles[user_id] = extract_handle_from_url(profile_url, platform)
+    try:
+        infos = fetch_codeforces_info_batch([h for h in handles.values() if h])
+    except Exception as e:
+        # Fall back to one user.info call per user
+        print(f"Codeforces batch user.info failed, fetching individually: {e}")
+        return [
+            (_single, (user_id, fetch_user_data, url, platform, codeforces_sync.get((handles[user_id] or "").lower())))
+            for user_id, url, platform in group
+        ]
+
+    jobs = []
+    for user_id, handle in handles.items():
+        user_info = infos.get(handle.lower()) if handle else None
+        if user_info:
+            sync = codeforces_sync.get(handle.lower())
+            jobs.append((_single, (user_id, fetch_codeforces_data, user_info["handle"], user_info, sync)))
+    return jobs
+
+def _leetcode_batch(handles):
+    """Batch job: `handles` maps user_id to LeetCode handle."""
+    data = fetch_leetcode_batch(list(handles.values()))
+    return {user_id: data.get(handle) for user_id, handle in handles.items()}
+
+def _leetcode_jobs(group):
+    """Splits the LeetCode users into LEETCODE_BATCH_SIZE-sized aliased queries."""
+    handles = {}
+    for user_id, profile_url, platform in group:
+        handle = extract_handle_from_url(profile_url, platform)
+        if handle:
+            handles[user_id] = handle
+    items = list(handles.items())
+    return [
+        (_leetcode_batch, (dict(items[i:i + LEETCODE_BATCH_SIZE]),))
+        for i in range(0, len(items), LEETCODE_BATCH_SIZE)
+    ]
+
+def fetch_all_users_data(targets, codeforces_sync=None):
+    """
+    Fetches data for many users concurrently.
+    `targets` is a list of (user_id, profile_url, platform) tuples and
+    `codeforces_sync` maps lowercased Codeforces handles to their stored solved state.
+    Returns a dict mapping user_id to the fetched data (or None on failure).
+    """
+    by_platform = {}
+    for user_id, profile_url, platform in targets:
+        by_platform.setdefault((platform or "").lower(), []).append((user_id, profile_url, platform))
+
+    pools = []
+    futures = []
+    try:
+        # Codeforces goes last: its batched user.info runs inline here, and the
+        # other platforms' pools should already be busy while it does
+        for p, group in sorted(by_platform.items(), key=lambda item: item[0] == "codeforces"):
+            workers = max(1, min(PLATFORM_CONCURRENCY.get(p, 1), len(group)))
+            pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f"fetch-{p or 'unknown'}")
+            pools.append(pool)
+            if p == "codeforces":
+                jobs = _codeforces_jobs(group, codeforces_sync or {})
+            elif p == "leetcode":
+                jobs = _leetcode_jobs(group)
+            else:
+                jobs = [(_single, (user_id, fetch_user_data, url, platform)) for user_id, url, platform in group]
+            for func, args in jobs:
+                futures.append(pool.submit(_timed_job, p or "unknown", func, *args))
+
+        # Users no job covers (e.g. unknown Codeforces handles) get None
+        results = {user_id: None for user_id, _, _ in targets}
+        for future in futures:
+            try:
+                results.update(future.result())
+            except Exception as e:
+                print(f"Error in refresh job: {e}")
+        return results
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=False)
@@ -0,0 +1,123 @@
+import os
+import time
+import threading
+from http_utils import pop_throttle_events
+
+# Upstream request budget per platform per minute. Codeforces asks API
+# clients to stay around one call every two seconds. Each process that runs
+# the scheduler or `flask refresh-worker` has its own budget, so lower these
+# when several of them share an outbound IP.
+REQUESTS_PER_MINUTE = {
+    "codeforces": float(os.environ.get('CODEFORCES_REQUESTS_PER_MINUTE', 30)),
+    "leetcode": float(os.environ.get('LEETCODE_REQUESTS_PER_MINUTE', 30)),
+    "codechef": float(os.environ.get('CODECHEF_REQUESTS_PER_MINUTE', 20)),
+    "atcoder": float(os.environ.get('ATCODER_REQUESTS_PER_MINUTE', 30)),
+    "hackerrank": float(os.environ.get('HACKERRANK_REQUESTS_PER_MINUTE', 30)),
+}
+
+# Typical upstream requests spent refreshing one user of each platform
+REQUESTS_PER_USER = {
+    "codeforces": 2,  # user.rating + user.status (user.info is batched)
+    "leetcode": 1,    # one combined query (batched during refreshes)
+    "codechef": 1,    # 2 when the API wrapper fails and we scrape
+    "atcoder": 2,
+    "hackerrank": 1,
+}
+
+# Seconds between scheduler ticks
+SCHEDULER_TICK_SECONDS = int(os.environ.get('SCHEDULER_TICK_SECONDS', 60))
+
+class TokenBucket:
+    """
+    Token bucket whose refill rate adapts to upstream pressure: it is halved
+    whenever a tick saw 429s/timeouts and grows back by 10% of the configured
+    rate after every clean tick.
+    """
+
+    def __init__(self, per_minute, burst_minutes=1.0):
+        self.base_rate = per_minute
+        self.rate = per_minute
+        self.min_rate = max(per_minute / 16, 1)
+        self.capacity = per_minute * burst_minutes
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + self.rate * (now - self.updated) / 60)
+        self.updated = now
+
+    def take(self, cost, limit=None):
+        """Takes tokens for as many `cost`-sized units as are available (up to `limit`)."""
+        self.refill()
+        units = int(self.tokens // cost)
+        if limit is not None:
+            units = min(units, limit)
+        self.tokens -= units * cost
+        return units
+
+    def give_back(self, tokens):
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def penalize(self):
+        self.rate = max(self.min_rate, self.rate / 2)
+
+    def recover(self):
+        self.rate = min(self.base_rate, self.rate + self.base_rate / 10)
+
+class RefreshScheduler:
+    """Decides how many of the stalest users of each platform to refresh per tick."""
+
+    def __init__(self, budgets=REQUESTS_PER_MINUTE):
+        self.buckets = {p: TokenBucket(rate) for p, rate in budgets.items()}
+        self.lock = threading.Lock()
+        self.stats = {p: {"refreshed": 0, "throttled": 0} for p in budgets}
+
+    def plan(self):
+        """Returns {platform: number of users to refresh this tick}."""
+        with self.lock:
+            return {p: bucket.take(REQUESTS_PER_USER.get(p, 1)) for p, bucket in self.buckets.items()}
+
+    def settle(self, planned, refreshed):
+        """
+        Refunds tokens planned for users that were not found and adapts each
+        platform's rate to the 429s/timeouts seen since the last tick.
+        """
+        throttled = pop_throttle_events()
+        with self.lock:
+            for p, bucket in self.buckets.items():
+                unused = planned.get(p, 0) - refreshed.get(p, 0)
+                if unused > 0:
+                    bucket.give_back(unused * REQUESTS_PER_USER.get(p, 1))
+                self.stats[p]["refreshed"] += refreshed.get(p, 0)
+                if throttled.get(p):
+                    self.stats[p]["throttled"] += throttled[p]
+                    bucket.penalize()
+                    print(f"Scheduler: {p} throttled {throttled[p]}x, slowing to {bucket.rate:.1f} req/min")
+                else:
+                    bucket.recover()
+
+    def get_stats(self):
+        with self.lock:
+            return {
+                p: dict(self.stats[p], rate_per_minute=round(bucket.rate, 2), tokens=round(bucket.tokens, 2))
+                for p, bucket in self.buckets.items()
+            }
+
+def acquire_scheduler_lock(path):
+    """
+    Takes a non-blocking exclusive lock on `path` so only one process per host
+    (e.g. one of several gunicorn workers) runs the scheduler.
+    Returns the open lock file, or None if another process holds it.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return open(path, 'a')  # no flock (Windows): single-process dev server
+    lock_file = open(path, 'a')
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        return None
+    return lock_file